@@ -1,15 +1,87 @@
 from fastapi import FastAPI, File, UploadFile
 from fastapi.responses import JSONResponse
-import tensorflow as tf
-from tensorflow.keras.applications.mobilenet_v2 import MobileNetV2, preprocess_input, decode_predictions
-from tensorflow.keras.preprocessing import image
 import numpy as np
-from io import BytesIO
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.concurrency import run_in_threadpool
+from image_ingest import UploadLimit, read_upload, load_array
+from inference import INFERENCE_BACKEND, load_backend, decode_predictions
+import metrics
+import time
+
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "16"))
+BATCH_WAIT_MS = float(os.getenv("BATCH_WAIT_MS", "5"))
 
 app = FastAPI()
+app.add_middleware(UploadLimit)
+metrics.install(app)
+
+batch_sizes = metrics.Histogram("model_batch_size", "Images per MobileNetV2 batch", buckets=(1, 2, 4, 8, 16, 32, 64))
+
+# MobileNetV2 model: an AI model for image recognition. The runtime is chosen by INFERENCE_BACKEND
+# (Keras reference, or an INT8 TFLite/ONNX export) and loaded, with its labels, by the predictor thread
+# on the first prediction, not at import.
+def load_model():
+    return load_backend(INFERENCE_BACKEND)
+
+class BatchPredictor:
+    # Collects concurrent requests into one model call of up to `max_batch_size` images,
+    # waiting at most `max_wait_ms` after the first image arrives
+    def __init__(self, load_model, max_batch_size: int = BATCH_SIZE, max_wait_ms: float = BATCH_WAIT_MS):
+        self.load_model = load_model
+        self.model = None
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._worker = None
+        # A single thread keeps model calls serialized while the event loop keeps accepting requests
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    async def predict(self, x: np.ndarray) -> np.ndarray:
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((x, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
 
-# MobileNetV2 model: an AI model for image recognition, coming from TensorFlow
-model = MobileNetV2(weights='imagenet')
+            inputs = np.stack([x for x, _ in batch])
+            try:
+                preds = await loop.run_in_executor(self._executor, self._predict, inputs)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), pred in zip(batch, preds):
+                if not future.done():
+                    future.set_result(pred)
+
+    def _predict(self, inputs: np.ndarray) -> np.ndarray:
+        if self.model is None:
+            self.model = self.load_model()
+        start = time.perf_counter()
+        preds = self.model.predict(inputs)
+        metrics.model_seconds.observe(time.perf_counter() - start, model=f"mobilenet_v2_{INFERENCE_BACKEND}", outcome="ok")
+        batch_sizes.observe(len(inputs))
+        return preds
+
+predictor = BatchPredictor(load_model)
 
 @app.post('/')
 async def home():
@@ -17,15 +89,11 @@ async def home():
 
 @app.post('/predict')
 async def predict(file: UploadFile = File(...)):
-    contents = await file.read()
-    img = image.load_img(BytesIO(contents), target_size=(224, 224))
-    x = image.img_to_array(img)
-    x = np.expand_dims(x, axis=0)
-    x = preprocess_input(x)
-    
-    preds = model.predict(x)
-    results = decode_predictions(preds, top=1)[0]
-    print(results)
+    contents = await read_upload(file)
+    x = await run_in_threadpool(load_array, contents, (224, 224))
+
+    preds = await predictor.predict(x)
+    results = decode_predictions(np.expand_dims(preds, axis=0), top=1)[0]
 
         # Converting the results to a JSON-serializable format
     serialized_results = []
@@ -35,12 +103,11 @@ async def predict(file: UploadFile = File(...)):
             'label': result[1],
             'score': float(result[2])
         })
-    print(serialized_results)
-    
+
     return JSONResponse(content={'predictions': serialized_results})
 
-  
 
-if _name_ == '_main_':
+
+if __name__ == '__main__':
     import uvicorn
-    uvicorn.run(app, host='0.0.0.0', port=8000)
\ No newline at end of file
+    uvicorn.run(app, host='0.0.0.0', port=8000)
@@ -0,0 +1,65 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import raiseload
+from sqlalchemy import select
+import models, schemas
+from crud import challenge_cache, challenge_page_cache, _snapshot
+from eligibility import challenge_eligibility
+from leaderboard import leaderboard
+
+async def get_available_challenge(db: AsyncSession, account_id: int, min_points: int, max_points: int):
+    seen = challenge_eligibility.peek(account_id)
+    if seen is None:
+        seen = await db.run_sync(challenge_eligibility.seen, account_id)
+    # A pick that falls back to scanning the range is CPU work, kept off the event loop
+    challenge_id = await run_in_threadpool(challenge_eligibility.pick, seen, min_points, max_points)
+    if challenge_id is None:
+        return None
+    return await get_challenge(db, challenge_id)
+
+async def get_accounts(db: AsyncSession, skip: int = 0, limit: int = 10, after_id: int = None):
+    query = select(models.Account).options(raiseload('*'))
+    if after_id is not None:
+        query = query.where(models.Account.id > after_id)
+    result = await db.scalars(query.order_by(models.Account.id).offset(skip).limit(limit))
+    return result.all()
+
+async def get_challenge(db: AsyncSession, id: int):
+    # Reads through crud's challenge cache; served as a ChallengeSummary rather than a session-bound instance
+    data = challenge_cache.get(id)
+    if data is None:
+        db_challenge = await db.scalar(select(models.Challenge).options(raiseload('*')).where(models.Challenge.id == id))
+        if db_challenge is None:
+            return None
+        data = _snapshot(db_challenge)
+        challenge_cache.set(id, data)
+    return schemas.ChallengeSummary(**data)
+
+async def get_challenges(db: AsyncSession, skip: int = 0, limit: int = 10, after_id: int = None):
+    page = challenge_page_cache.get((skip, limit, after_id))
+    if page is None:
+        query = select(models.Challenge).options(raiseload('*'))
+        if after_id is not None:
+            query = query.where(models.Challenge.id > after_id)
+        result = await db.scalars(query.order_by(models.Challenge.id).offset(skip).limit(limit))
+        page = [schemas.ChallengeSummary.model_validate(c) for c in result.all()]
+        challenge_page_cache.set((skip, limit, after_id), page)
+    return page
+
+async def get_accounts_by_points(db: AsyncSession, skip: int = 0, limit: int = 10, after: tuple = None):
+    if not leaderboard.loaded:
+        await db.run_sync(leaderboard.load)
+    ids = leaderboard.page(skip=skip, limit=limit, after=after)
+    if not ids:
+        return []
+    result = await db.scalars(select(models.Account).options(raiseload('*')).where(models.Account.id.in_(ids)))
+    accounts = {a.id: a for a in result.all()}
+    return [accounts[id] for id in ids if id in accounts]
+
+async def get_account_rank(db: AsyncSession, account_id: int):
+    if not leaderboard.loaded:
+        await db.run_sync(leaderboard.load)
+    rank = leaderboard.rank(account_id)
+    if rank is None:
+        return None
+    return {"account_id": account_id, "points": leaderboard.points(account_id), "rank": rank, "total": leaderboard.size()}
@@ -0,0 +1,533 @@
+"""Load-test harness for the AURA API.
+
+Seeds a database through the `models` tables, drives the FastAPI `app` from main.py in-process
+with stubbed Gemini/MobileNet models, and prints throughput and latency percentiles per scenario
+as JSON so runs can be compared between commits:
+
+    python benchmark.py --accounts 1000000 --challenges 100000 --output bench.json
+
+With --inference-backends, each MobileNetV2 backend from inference.py (keras, tflite, onnx) is also
+loaded in its own interpreter and measured for startup, latency, throughput and peak RSS.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from io import BytesIO
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///benchmark.db")
+    parser.add_argument("--accounts", type=int, default=10000)
+    parser.add_argument("--challenges", type=int, default=1000)
+    parser.add_argument("--statuses-per-account", type=int, default=5)
+    parser.add_argument("--long-history-accounts", type=int, default=100, help="Accounts that have seen most of the catalog")
+    parser.add_argument("--long-history-fraction", type=float, default=0.9, help="Share of the catalog those accounts have seen")
+    parser.add_argument("--friend-alpha", type=float, default=1.5, help="Pareto shape of the friend-degree distribution")
+    parser.add_argument("--max-friends", type=int, default=5000)
+    parser.add_argument("--reseed", action="store_true", help="Drop and recreate the tables before seeding")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--bulk-size", type=int, default=100, help="Items per request in the bulk scenarios")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--model-latency-ms", type=float, default=200, help="Latency of the stubbed models")
+    parser.add_argument("--model-per-image-ms", type=float, default=5, help="Extra stubbed MobileNet latency per image in a batch")
+    parser.add_argument("--image-size", type=int, default=2048, help="Side of the synthetic upload in pixels")
+    parser.add_argument("--scenarios", default="", help="Comma-separated subset of scenarios to run")
+    parser.add_argument("--skip-startup", action="store_true")
+    parser.add_argument("--inference-backends", default="", help="Comma-separated MobileNetV2 backends to measure, e.g. keras,tflite,onnx")
+    parser.add_argument("--inference-batch-size", type=int, default=16)
+    parser.add_argument("--upload-sizes", default="", help="Comma-separated photo sides (px) to measure upload RSS/latency for, e.g. 1024,3000,4000")
+    parser.add_argument("--upload-requests", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    return parser.parse_args()
+
+def child_env():
+    # Measurements in fresh interpreters import the app and this module from the repository root
+    root = os.path.dirname(os.path.abspath(__file__))
+    return {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [root, os.getenv("PYTHONPATH")]))}
+
+def chunked(rows, size=10000):
+    # Lists of up to `size` rows from any iterable, so seed rows can be generated lazily
+    rows = iter(rows)
+    while chunk := list(itertools.islice(rows, size)):
+        yield chunk
+
+def seed(engine, args):
+    import models
+    from sqlalchemy import func, select
+
+    if args.reseed:
+        models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        if conn.execute(select(func.count()).select_from(models.Account.__table__)).scalar():
+            return
+
+        rng = random.Random(args.seed)
+        n = args.accounts
+        accounts = ({
+            "id": i,
+            "username": f"user{i}",
+            "email": f"user{i}@example.com",
+            "password": "benchmark",
+            "points": int(rng.paretovariate(1.2) * 10),
+            "first_name": "Bench",
+            "last_name": f"User{i}"
+        } for i in range(1, n + 1))
+        for rows in chunked(accounts):
+            conn.execute(models.Account.__table__.insert(), rows)
+
+        challenges = ({
+            "id": i,
+            "description": f"Benchmark challenge {i}",
+            "points": rng.randint(1, 100)
+        } for i in range(1, args.challenges + 1))
+        for rows in chunked(challenges):
+            conn.execute(models.Challenge.__table__.insert(), rows)
+
+        # Power-law friend graph: Pareto-distributed degrees, with targets skewed towards low ids (hubs)
+        edges = set()
+        for a in range(1, n + 1):
+            degree = min(int(rng.paretovariate(args.friend_alpha)), args.max_friends, n - 1)
+            for _ in range(degree):
+                b = 1 + int(n * rng.random() ** 3)
+                if a != b:
+                    edges.add((a, b))
+                    edges.add((b, a))
+        friends = ({"account_id": a, "friend_id": b} for a, b in edges)
+        for rows in chunked(friends):
+            conn.execute(models.friends.insert(), rows)
+
+        # The highest account ids get long histories, for the get_challenge_long_history scenario.
+        # Rows are generated per chunk: long histories over a large catalog run to millions of rows.
+        long_history = int(args.challenges * args.long_history_fraction)
+
+        def statuses():
+            for a in range(1, n + 1):
+                seen = long_history if a > n - args.long_history_accounts else args.statuses_per_account
+                for challenge_id in rng.sample(range(1, args.challenges + 1), min(seen, args.challenges)):
+                    outcome = rng.random()
+                    yield {
+                        "account_id": a,
+                        "challenge_id": challenge_id,
+                        "completed": outcome < 0.5,
+                        "failed": 0.5 <= outcome < 0.7
+                    }
+
+        for rows in chunked(statuses()):
+            conn.execute(models.ChallengeStatus.__table__.insert(), rows)
+
+class StubResponse:
+    text = "yes"
+
+class StubGemini:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def generate_content_async(self, contents):
+        await asyncio.sleep(self.latency)
+        return StubResponse()
+
+class StubMobileNet:
+    # Fixed per-call overhead plus a per-image cost, the shape that makes batching pay off
+    def __init__(self, latency: float, per_image: float = 0):
+        self.latency = latency
+        self.per_image = per_image
+
+    def predict(self, inputs, **kwargs):
+        import numpy as np
+        time.sleep(self.latency + self.per_image * len(inputs))
+        return np.random.rand(len(inputs), 1000).astype(np.float32)
+
+def stub_labels() -> str:
+    # Placeholder ImageNet labels so the MobileNet route runs without an export or TensorFlow
+    import tempfile
+    path = os.path.join(tempfile.mkdtemp(prefix="aura-bench-"), "imagenet_class_index.json")
+    with open(path, "w") as f:
+        json.dump({str(i): [f"n{i:08d}", f"class_{i}"] for i in range(1000)}, f)
+    return path
+
+def make_image(size: int) -> bytes:
+    from PIL import Image
+    import numpy as np
+    pixels = np.random.randint(0, 256, (size, size, 3), dtype=np.uint8)
+    out = BytesIO()
+    Image.fromarray(pixels).save(out, format="JPEG", quality=90)
+    return out.getvalue()
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    i = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[i]
+
+async def run_scenario(client, make_request, total: int, concurrency: int, warmup: int):
+    for _ in range(warmup):
+        await make_request(client)
+
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await make_request(client)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400 and response.status_code != 404:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput_rps": total / elapsed if elapsed else None,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": latencies[-1] * 1000
+    }
+
+def one_at_a_time(requests):
+    # Sends the requests sequentially, like a client without the bulk endpoints; returns the first failure
+    async def make_request(client):
+        last = None
+        for method, url, kwargs in requests():
+            last = await client.request(method, url, **kwargs)
+            if last.status_code >= 400:
+                return last
+        return last
+    return make_request
+
+def scenarios(args, image: bytes):
+    n, rng = args.accounts, random.Random(args.seed + 1)
+    account = lambda: 1 + int(n * rng.random() ** 2)
+    new_challenges = lambda: [
+        {"description": f"Bulk benchmark challenge {rng.randrange(10 ** 15)}", "points": rng.randint(1, 100)}
+        for _ in range(args.bulk_size)
+    ]
+    # Each call starts from a random sender so the same pairs are rarely requested twice
+    friend_batch = lambda: (rng.randrange(1, n + 1), rng.sample(range(1, n + 1), min(args.bulk_size, n)))
+
+    def single_friend_requests():
+        sender, receivers = friend_batch()
+        return [("POST", f"/accounts/{sender}/send_friend_request/{r}", {}) for r in receivers if r != sender]
+
+    def bulk_friend_requests(c):
+        sender, receivers = friend_batch()
+        return c.post(f"/accounts/{sender}/send_friend_requests", json=[r for r in receivers if r != sender])
+
+    return {
+        "leaderboard": lambda c: c.get("/accounts/leaderboard", params={"skip": rng.randrange(max(1, n - 50)), "limit": 50}),
+        "rank": lambda c: c.get(f"/accounts/{account()}/rank"),
+        "search": lambda c: c.get("/accounts/search/", params={"username": f"user{rng.randrange(1, n + 1)}"[:rng.randint(3, 7)]}),
+        # Mid-string queries ("ser12") skip the prefix phase and go through the trigram index
+        "search_substring": lambda c: c.get("/accounts/search/", params={"username": f"ser{rng.randrange(1, n + 1)}"[:rng.randint(3, 6)]}),
+        "get_challenge": lambda c: c.get(f"/accounts/{account()}/get_challenge", params={"min_points": 1, "max_points": 100}),
+        "get_challenge_long_history": lambda c: c.get(
+            f"/accounts/{n - rng.randrange(max(1, args.long_history_accounts))}/get_challenge",
+            params={"min_points": 1, "max_points": 100}
+        ),
+        "friends": lambda c: c.get(f"/accounts/{account()}/friends"),
+        "friend_leaderboard": lambda c: c.get(f"/accounts/{account()}/friends/leaderboard"),
+        # Signups hash a new password; logins verify a seeded one (rehashing it from plaintext the first time)
+        "signup": lambda c: c.post("/accounts/", json={
+            "email": f"signup{rng.randrange(10 ** 12)}@example.com",
+            "username": f"signup{rng.randrange(10 ** 12)}",
+            "password": "benchmark-password"
+        }),
+        # Bulk and one-at-a-time variants write the same --bulk-size items per measured request
+        "create_challenges_bulk": lambda c: c.post("/challenges/bulk", json=new_challenges()),
+        "create_challenges_single": one_at_a_time(lambda: [("POST", "/challenges/", {"json": item}) for item in new_challenges()]),
+        "send_friend_requests_bulk": bulk_friend_requests,
+        "send_friend_requests_single": one_at_a_time(single_friend_requests),
+        "login": lambda c: c.post("/accounts/login", json={"email": f"user{account()}@example.com", "password": "benchmark"}),
+        # Unique descriptions miss the verdict cache; the duplicate scenario resubmits the same photo
+        "predict": lambda c: c.post(
+            "/predict",
+            params={"description": f"a photo for challenge {rng.randrange(10 ** 9)}"},
+            files={"file": ("photo.jpg", image, "image/jpeg")}
+        ),
+        "predict_duplicate": lambda c: c.post(
+            "/predict",
+            params={"description": "a photo for the duplicate challenge"},
+            files={"file": ("photo.jpg", image, "image/jpeg")}
+        )
+    }
+
+def sync_app():
+    # The account/challenge routes as they were before the async stack: sync handlers on Starlette's
+    # threadpool with the sync SessionLocal, for the *_sync comparison scenarios
+    from fastapi import FastAPI, Depends, HTTPException
+    from sqlalchemy.orm import Session
+    import crud, schemas
+    from dependencies import get_db
+
+    app = FastAPI()
+
+    @app.get("/accounts/leaderboard", response_model=list[schemas.AccountSummary])
+    def get_leaderboard(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+        return crud.get_accounts_by_points(db, skip=skip, limit=limit)
+
+    @app.get("/accounts/{account_id}/get_challenge", response_model=schemas.ChallengeSummary)
+    def get_challenge_for_user(account_id: int, min_points: int, max_points: int, db: Session = Depends(get_db)):
+        challenge = crud.get_available_challenge(db, account_id, min_points, max_points)
+        if not challenge:
+            raise HTTPException(status_code=404, detail="No available challenge found within the specified points range.")
+        return challenge
+
+    return app
+
+SYNC_SCENARIOS = ("leaderboard", "get_challenge")
+
+def measure_startup():
+    # Import-to-first-response of main.py in a fresh interpreter, the cost every cold start pays
+    code = (
+        "import time; start = time.perf_counter()\n"
+        "import asyncio, httpx, main\n"
+        "imported = time.perf_counter()\n"
+        "async def first():\n"
+        "    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://bench') as c:\n"
+        "        await c.get('/test')\n"
+        "asyncio.run(first())\n"
+        "print(imported - start, time.perf_counter() - start)\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=child_env(), check=True).stdout
+    imported, first_response = map(float, output.split())
+    return {"import_ms": imported * 1000, "first_response_ms": first_response * 1000}
+
+def backend_stats(name: str, requests: int, batch_size: int):
+    # Runs in a fresh interpreter (see measure_backend) so startup and RSS belong to this backend alone
+    start = time.perf_counter()
+    import numpy as np
+    import inference
+    if not os.path.exists(inference.CLASS_INDEX_PATH):
+        inference.CLASS_INDEX_PATH = stub_labels()
+    backend = inference.load_backend(name)
+    loaded = time.perf_counter()
+    images = (np.random.rand(batch_size, 224, 224, 3) * 255).astype(np.float32)
+    backend.predict(images[:1])
+    first = time.perf_counter()
+
+    latencies = []
+    for _ in range(requests):
+        t = time.perf_counter()
+        backend.predict(images[:1])
+        latencies.append(time.perf_counter() - t)
+    latencies.sort()
+
+    batches = max(1, requests // batch_size)
+    t = time.perf_counter()
+    for _ in range(batches):
+        backend.predict(images)
+    elapsed = time.perf_counter() - t
+
+    return {
+        "load_ms": (loaded - start) * 1000,
+        "first_prediction_ms": (first - start) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "batch_size": batch_size,
+        "throughput_images_per_s": batches * batch_size / elapsed,
+        "peak_rss_mb": memory_mb("VmHWM")
+    }
+
+def memory_mb(field: str) -> float:
+    # VmRSS (current) or VmHWM (peak) of this process. ru_maxrss is not used because Linux carries
+    # it over from the parent through fork/exec, so a child would report the harness' own peak.
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError(f"{field} not found in /proc/self/status")
+
+def reset_peak_memory():
+    # Writing 5 to clear_refs resets VmHWM to the current RSS (Linux 4.0+)
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+
+def upload_stats(app_name: str, image_path: str, requests: int):
+    # Peak RSS and latency of photo uploads through /predict, in a fresh interpreter (see measure_upload).
+    # The photo is generated by the parent so its construction does not count towards the peak.
+    import httpx
+    with open(image_path, "rb") as f:
+        image = f.read()
+    if app_name == "main":
+        import main
+        main.verifier.model = StubGemini(0)
+        app = main.app
+    else:
+        import inference
+        import NetMobileV2
+        if not os.path.exists(inference.CLASS_INDEX_PATH):
+            inference.CLASS_INDEX_PATH = stub_labels()
+        # The stub replaces load_backend, which would otherwise load the labels
+        inference.load_class_index()
+        NetMobileV2.predictor.model = StubMobileNet(0)
+        app = NetMobileV2.app
+
+    async def upload(client, i):
+        # A unique description per request so the verdict cache never short-circuits ingest
+        return await client.post("/predict", params={"description": f"upload {i}"}, files={"file": ("photo.jpg", image, "image/jpeg")})
+
+    async def measure():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+            # The first request pays for imports and model/worker setup
+            await upload(client, -1)
+            reset_peak_memory()
+            baseline = memory_mb("VmRSS")
+            latencies, errors = [], 0
+            for i in range(requests):
+                start = time.perf_counter()
+                response = await upload(client, i)
+                latencies.append(time.perf_counter() - start)
+                errors += response.status_code >= 400
+            return baseline, sorted(latencies), errors
+
+    baseline, latencies, errors = asyncio.run(measure())
+    peak = memory_mb("VmHWM")
+    return {
+        "upload_bytes": len(image),
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": peak,
+        "rss_growth_mb": peak - baseline
+    }
+
+def measure_upload(app_name: str, size: int, args):
+    import tempfile
+    with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as f:
+        f.write(make_image(size))
+    try:
+        code = (
+            "import json, benchmark\n"
+            f"print('UPLOAD_STATS', json.dumps(benchmark.upload_stats({app_name!r}, {f.name!r}, {args.upload_requests})))\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=child_env())
+    finally:
+        os.unlink(f.name)
+    lines = [line for line in result.stdout.splitlines() if line.startswith("UPLOAD_STATS ")]
+    if result.returncode or not lines:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+    return {"image_size": size, **json.loads(lines[-1].split(" ", 1)[1])}
+
+def measure_backend(name: str, args):
+    code = (
+        "import json, benchmark\n"
+        f"print(json.dumps(benchmark.backend_stats({name!r}, {args.requests}, {args.inference_batch_size})))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=child_env())
+    if result.returncode:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+async def main_async(args, report):
+    import httpx
+    import main
+    from database import engine
+
+    seed_start = time.perf_counter()
+    seed(engine, args)
+    report["seed_seconds"] = time.perf_counter() - seed_start
+
+    latency = args.model_latency_ms / 1000
+    main.verifier.model = StubGemini(latency)
+
+    image = make_image(args.image_size)
+    selected = set(filter(None, args.scenarios.split(",")))
+    requests = scenarios(args, image)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for name, make_request in requests.items():
+            if selected and name not in selected:
+                continue
+            report["scenarios"][name] = result = await run_scenario(client, make_request, args.requests, args.concurrency, args.warmup)
+            if "_bulk" in name or "_single" in name:
+                result["items_per_s"] = result["throughput_rps"] * args.bulk_size
+
+    # The same requests against the sync stack, reported as <scenario>_sync
+    transport = httpx.ASGITransport(app=sync_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for name in SYNC_SCENARIOS:
+            if selected and name + "_sync" not in selected:
+                continue
+            report["scenarios"][name + "_sync"] = await run_scenario(client, requests[name], args.requests, args.concurrency, args.warmup)
+
+    # The batched MobileNet path against a per-request baseline: the same predictor with batches of one
+    mobilenet = {"mobilenet_predict": None, "mobilenet_predict_unbatched": 1}
+    if selected and not selected & mobilenet.keys():
+        return
+    import inference
+    import NetMobileV2
+    if not os.path.exists(inference.CLASS_INDEX_PATH):
+        inference.CLASS_INDEX_PATH = stub_labels()
+    # The stub replaces load_backend, which would otherwise load the labels
+    inference.load_class_index()
+    transport = httpx.ASGITransport(app=NetMobileV2.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for name, batch_size in mobilenet.items():
+            if selected and name not in selected:
+                continue
+            predictor = NetMobileV2.BatchPredictor(NetMobileV2.load_model, *(batch_size, 0) if batch_size else ())
+            predictor.model = StubMobileNet(latency, args.model_per_image_ms / 1000)
+            NetMobileV2.predictor = predictor
+            report["scenarios"][name] = result = await run_scenario(
+                client,
+                lambda c: c.post("/predict", files={"file": ("photo.jpg", image, "image/jpeg")}),
+                args.requests, args.concurrency, args.warmup
+            )
+            result["max_batch_size"] = predictor.max_batch_size
+
+def run():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+    random.seed(args.seed)
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    report = {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "config": vars(args),
+        "scenarios": {}
+    }
+    if not args.skip_startup:
+        report["startup"] = measure_startup()
+    sizes = [int(s) for s in args.upload_sizes.split(",") if s]
+    if sizes:
+        report["uploads"] = {
+            app_name: [measure_upload(app_name, size, args) for size in sizes]
+            for app_name in ("main", "mobilenet")
+        }
+    backends = [b for b in args.inference_backends.split(",") if b]
+    if backends:
+        report["inference_backends"] = {name: measure_backend(name, args) for name in backends}
+    asyncio.run(main_async(args, report))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    run()
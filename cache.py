@@ -0,0 +1,100 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+# Every cache registers itself here so its statistics can be exposed
+caches = {}
+
+class CacheBackend:
+    # Interface for an optional shared tier (Redis, memcached, ...) used by caches created with shared=True.
+    # Implementations handle serialization; get returns None on a miss.
+    def get(self, key: str):
+        raise NotImplementedError
+
+    def set(self, key: str, value, ttl: float):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+shared_backend = None
+
+def set_shared_backend(backend: CacheBackend):
+    global shared_backend
+    shared_backend = backend
+
+class TTLCache:
+    # In-process LRU cache whose entries also expire `ttl` seconds after they are set,
+    # optionally backed by the shared tier on a local miss
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 300, shared: bool = False):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared = shared
+        self._data = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        caches[name] = self
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires >= time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+
+        if self.shared and shared_backend is not None:
+            value = shared_backend.get(f"{self.name}:{key}")
+            if value is not None:
+                self._store(key, value)
+                with self._lock:
+                    self.shared_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def set(self, key, value):
+        self._store(key, value)
+        if self.shared and shared_backend is not None:
+            shared_backend.set(f"{self.name}:{key}", value, self.ttl)
+
+    def _store(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+        if self.shared and shared_backend is not None:
+            shared_backend.delete(f"{self.name}:{key}")
+
+    def clear(self):
+        # Local tier only; shared entries expire on their own TTL
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl
+        }
@@ -0,0 +1,67 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+
+# scrypt cost parameters; raising them makes new hashes stronger and old ones get rehashed on the next login
+SCRYPT_N = int(os.getenv("SCRYPT_N", str(2 ** 15)))
+SCRYPT_R = int(os.getenv("SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("SCRYPT_P", "1"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+
+PREFIX = "scrypt"
+
+def _derive(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=128 * n * r * (p + 2), dklen=32)
+
+def _encode(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+def _hash(password: str, n: int, r: int, p: int) -> str:
+    salt = os.urandom(16)
+    return "$".join([PREFIX, str(n), str(r), str(p), _encode(salt), _encode(_derive(password, salt, n, r, p))])
+
+def _verify(password: str, n: int, r: int, p: int, salt: str, expected: str) -> bool:
+    return hmac.compare_digest(_derive(password, base64.b64decode(salt), n, r, p), base64.b64decode(expected))
+
+# Hashing runs in worker processes and is awaited from async routes, so it neither holds the GIL nor
+# ties up a request thread. Workers come from a forkserver that preloads only this module (spawn where
+# forkserver is unavailable), so they do not inherit the app's state. Either way every worker re-imports
+# the launching script as __mp_main__: under `python main.py` that re-runs main.py's module body, so run
+# the app with `uvicorn main:app` and keep side effects in scripts that use the pool behind a __main__ guard.
+_pool = None
+_pool_lock = Lock()
+
+def _mp_context():
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+def pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, mp_context=_mp_context())
+    return _pool
+
+async def hash_password(password: str) -> str:
+    return await asyncio.wrap_future(pool().submit(_hash, password, SCRYPT_N, SCRYPT_R, SCRYPT_P))
+
+async def verify_password(password: str, stored: str) -> tuple:
+    # Returns (matches, needs_rehash)
+    if not stored:
+        return False, False
+    if not stored.startswith(PREFIX + "$"):
+        # Legacy row stored before hashing was introduced
+        matches = hmac.compare_digest(password.encode(), stored.encode())
+        return matches, matches
+    _, n, r, p, salt, expected = stored.split("$")
+    n, r, p = int(n), int(r), int(p)
+    matches = await asyncio.wrap_future(pool().submit(_verify, password, n, r, p, salt, expected))
+    return matches, matches and (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
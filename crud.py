@@ -1,63 +1,108 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload, raiseload, make_transient_to_detached
 import models, schemas
-import random
+from leaderboard import leaderboard
+from search_index import username_index
+from social_graph import friend_graph
+from eligibility import challenge_eligibility
+from cache import TTLCache
+import os
+import heapq
+from datetime import datetime, timedelta
 from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 
 def get_available_challenge(db: Session, account_id: int, min_points: int, max_points: int):
-    # Find challenges within the specified points range
-    challenges = db.query(models.Challenge).filter(
-        models.Challenge.points >= min_points,
-        models.Challenge.points <= max_points
-    ).all()
-
-    if not challenges:
+    # Random challenge in the points range the user has never accepted, picked from the in-memory catalog
+    challenge_id = challenge_eligibility.pick(challenge_eligibility.seen(db, account_id), min_points, max_points)
+    if challenge_id is None:
         return None
+    return get_challenge(db, challenge_id)
 
-    # Find accepted challenges by the user
-    accepted_challenges = db.query(models.ChallengeStatus).filter(
-        models.ChallengeStatus.account_id == account_id,
-        models.ChallengeStatus.completed == False,
-        models.ChallengeStatus.failed == False
-    ).all()
-    
-    accepted_challenge_ids = {ch.challenge_id for ch in accepted_challenges}
+# Read-through caches for hot lookups. Entries are column snapshots (never the password), turned back
+# into session-bound instances without a query; writes below invalidate them explicitly.
+account_cache = TTLCache("accounts", maxsize=int(os.getenv("ACCOUNT_CACHE_SIZE", "10000")), ttl=float(os.getenv("ACCOUNT_CACHE_TTL", "60")), shared=True)
+account_email_cache = TTLCache("account_emails", maxsize=int(os.getenv("ACCOUNT_CACHE_SIZE", "10000")), ttl=float(os.getenv("ACCOUNT_CACHE_TTL", "60")), shared=True)
+challenge_cache = TTLCache("challenges", maxsize=int(os.getenv("CHALLENGE_CACHE_SIZE", "10000")), ttl=float(os.getenv("CHALLENGE_CACHE_TTL", "600")), shared=True)
+challenge_page_cache = TTLCache("challenge_pages", maxsize=1000, ttl=float(os.getenv("CHALLENGE_CACHE_TTL", "600")))
 
-    # Filter out challenges already accepted by the user
-    available_challenges = [ch for ch in challenges if ch.id not in accepted_challenge_ids]
+def _snapshot(obj, exclude=()):
+    return {c.key: getattr(obj, c.key) for c in obj.__table__.columns if c.key not in exclude}
 
-    if not available_challenges:
-        return None
+def _restore(db: Session, cls, data: dict):
+    obj = cls(**data)
+    make_transient_to_detached(obj)
+    return db.merge(obj, load=False)
 
-    # Return a random challenge from the available challenges
-    return random.choice(available_challenges)
+def invalidate_account(account_id: int, *emails):
+    account_cache.delete(account_id)
+    for email in emails:
+        account_email_cache.delete(email)
 
 def get_account(db: Session, id: int):
-    return db.query(models.Account).filter(models.Account.id == id).first()
+    data = account_cache.get(id)
+    if data is not None:
+        return _restore(db, models.Account, data)
+    db_account = db.query(models.Account).filter(models.Account.id == id).first()
+    if db_account:
+        account_cache.set(id, _snapshot(db_account, exclude=("password",)))
+    return db_account
 
 def get_account_by_email(db: Session, email: str):
-    return db.query(models.Account).filter(models.Account.email == email).first()
+    account_id = account_email_cache.get(email)
+    if account_id is not None:
+        db_account = get_account(db, account_id)
+        if db_account is not None and db_account.email == email:
+            return db_account
+        account_email_cache.delete(email)
+    db_account = db.query(models.Account).options(selectinload(models.Account.friends)).filter(models.Account.email == email).first()
+    if db_account:
+        account_email_cache.set(email, db_account.id)
+        account_cache.set(db_account.id, _snapshot(db_account, exclude=("password",)))
+    return db_account
 
-def get_accounts(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(models.Account).offset(skip).limit(limit).all()
+def get_accounts(db: Session, skip: int = 0, limit: int = 10, after_id: int = None):
+    query = db.query(models.Account).options(raiseload('*'))
+    if after_id is not None:
+        query = query.filter(models.Account.id > after_id)
+    return query.order_by(models.Account.id).offset(skip).limit(limit).all()
 
-def create_account(db: Session, user: schemas.AccountCreate):
+def create_account(db: Session, user: schemas.AccountCreate, password_hash: str):
+    # The password is hashed by the caller (credentials.hash_password), off the request thread
     db_account = models.Account(
         email=user.email,
         username=user.username,
-        password=user.password,
+        password=password_hash,
         first_name=user.first_name,
         last_name=user.last_name
     )
     db.add(db_account)
     db.commit()
     db.refresh(db_account)
+    leaderboard.set_points(db_account.id, db_account.points or 0)
+    username_index.add(db_account.id, db_account.username)
+    return db_account
+
+def get_account_for_login(db: Session, email: str):
+    # Uncached: the read-through caches never hold the password hash
+    return db.query(models.Account).filter(models.Account.email == email).first()
+
+def update_account_password(db: Session, db_account: models.Account, password_hash: str):
+    db_account.password = password_hash
+    db.commit()
+    db.refresh(db_account)
     return db_account
 
 def delete_account(db: Session, account_id: int):
     db_account = db.query(models.Account).filter(models.Account.id == account_id).first()
     if db_account:
+        email = db_account.email
         db.delete(db_account)
         db.commit()
+        invalidate_account(account_id, email)
+        leaderboard.remove(account_id)
+        username_index.remove(account_id)
+        friend_graph.remove_account(account_id)
+        challenge_eligibility.remove_account(account_id)
         return True
     return False
 
@@ -67,33 +112,87 @@ def update_account_username(db: Session, account_id: int, new_username: str):
         db_account.username = new_username
         db.commit()
         db.refresh(db_account)
+        invalidate_account(account_id)
+        username_index.add(account_id, new_username)
     return db_account
 
 def update_account_email(db: Session, account_id: int, new_email: str):
     db_account = db.query(models.Account).filter(models.Account.id == account_id).first()
     if db_account:
+        old_email = db_account.email
         db_account.email = new_email
         db.commit()
         db.refresh(db_account)
+        invalidate_account(account_id, old_email, new_email)
     return db_account
 
 def get_challenge(db: Session, id: int):
-    return db.query(models.Challenge).filter(models.Challenge.id == id).first()
+    data = challenge_cache.get(id)
+    if data is not None:
+        return _restore(db, models.Challenge, data)
+    db_challenge = db.query(models.Challenge).filter(models.Challenge.id == id).first()
+    if db_challenge:
+        challenge_cache.set(id, _snapshot(db_challenge))
+    return db_challenge
 
-def get_challenges(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(models.Challenge).offset(skip).limit(limit).all()
+def get_challenges(db: Session, skip: int = 0, limit: int = 10, after_id: int = None):
+    page = challenge_page_cache.get((skip, limit, after_id))
+    if page is None:
+        query = db.query(models.Challenge).options(raiseload('*'))
+        if after_id is not None:
+            query = query.filter(models.Challenge.id > after_id)
+        page = [schemas.ChallengeSummary.model_validate(c) for c in
+                query.order_by(models.Challenge.id).offset(skip).limit(limit).all()]
+        challenge_page_cache.set((skip, limit, after_id), page)
+    return page
 
 def create_challenge(db: Session, challenge: schemas.ChallengeCreate):
     db_challenge = models.Challenge(description=challenge.description, points=challenge.points)
     db.add(db_challenge)
     db.commit()
     db.refresh(db_challenge)
+    challenge_page_cache.clear()
+    challenge_eligibility.add_challenge(db_challenge.id, db_challenge.points)
     return db_challenge
 
+def create_challenges(db: Session, challenges: list[schemas.ChallengeCreate]):
+    # Insert every new challenge with one executemany in a single transaction; duplicates are reported per item
+    descriptions = {c.description for c in challenges}
+    existing = {d for (d,) in db.query(models.Challenge.description).filter(models.Challenge.description.in_(descriptions))}
+
+    rows = []
+    for c in challenges:
+        if c.description not in existing:
+            existing.add(c.description)
+            rows.append({"description": c.description, "points": c.points})
+    if rows:
+        db.execute(models.Challenge.__table__.insert(), rows)
+        db.commit()
+        challenge_page_cache.clear()
+
+    created = {r["description"] for r in rows}
+    ids = dict(db.query(models.Challenge.description, models.Challenge.id).filter(models.Challenge.description.in_(created))) if created else {}
+    results = []
+    for c in challenges:
+        if c.description in created:
+            challenge_eligibility.add_challenge(ids.get(c.description), c.points)
+            results.append({"id": ids.get(c.description), "ok": True})
+            created.discard(c.description)
+        else:
+            results.append({"id": None, "ok": False, "detail": "Challenge already exists."})
+    return results
+
 def accept_challenge(db: Session, account_id: int, challenge_id: int):
     db_account = get_account(db, account_id)
     db_challenge = get_challenge(db, challenge_id)
     if db_account and db_challenge:
+        # challenge_status has one row per (account, challenge), whether open, completed or failed
+        existing = db.query(models.ChallengeStatus).filter(
+            models.ChallengeStatus.account_id == account_id,
+            models.ChallengeStatus.challenge_id == challenge_id
+        ).first()
+        if existing:
+            raise Exception("Challenge already accepted.")
         db_challenge_status = models.ChallengeStatus(
             account_id=account_id,
             challenge_id=challenge_id,
@@ -101,54 +200,160 @@ def accept_challenge(db: Session, account_id: int, challenge_id: int):
             failed=False
         )
         db.add(db_challenge_status)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent accept of the same challenge won the insert
+            db.rollback()
+            raise Exception("Challenge already accepted.")
         db.refresh(db_challenge_status)
+        challenge_eligibility.mark_seen(account_id, [challenge_id])
         return db_challenge_status
     return None
 
-def complete_challenge(db: Session, account_id: int, challenge_id: int):
-    db_challenge_status = db.query(models.ChallengeStatus).filter(
+def _resolve_challenge(db: Session, account_id: int, challenge_id: int, completed: bool):
+    # One transaction: a conditional status update decides the winner, points move with an atomic
+    # increment, and the change is recorded in the points ledger
+    db_challenge = get_challenge(db, challenge_id)
+    points = (db_challenge.points if db_challenge else 0) or 0
+    outcome = models.ChallengeStatus.completed if completed else models.ChallengeStatus.failed
+    updated = db.query(models.ChallengeStatus).filter(
         models.ChallengeStatus.account_id == account_id,
-        models.ChallengeStatus.challenge_id == challenge_id
-    ).first()
-    if db_challenge_status:
-        if db_challenge_status.failed:
+        models.ChallengeStatus.challenge_id == challenge_id,
+        models.ChallengeStatus.completed == False,
+        models.ChallengeStatus.failed == False
+    ).update({outcome: True}, synchronize_session=False)
+
+    if not updated:
+        db.rollback()
+        db_challenge_status = db.query(models.ChallengeStatus).filter(
+            models.ChallengeStatus.account_id == account_id,
+            models.ChallengeStatus.challenge_id == challenge_id
+        ).first()
+        if db_challenge_status is None:
+            return None
+        if completed and db_challenge_status.failed:
             raise Exception("Challenge cannot be completed because it has already failed.")
-        db_challenge_status.completed = True
-        db.commit()
-        db.refresh(db_challenge_status)
-        db_account = get_account(db, account_id)
-        db_account.points += db_challenge_status.challenge.points
-        db.commit()
-        return db_account
-    return None
+        if not completed and db_challenge_status.completed:
+            raise Exception("Challenge cannot be failed because it has already been completed.")
+        raise Exception("Challenge has already been completed." if completed else "Challenge has already failed.")
 
-def fail_challenge(db: Session, account_id: int, challenge_id: int):
-    db_challenge_status = db.query(models.ChallengeStatus).filter(
+    delta = points if completed else -points
+    db.query(models.Account).filter(models.Account.id == account_id).update(
+        {models.Account.points: models.Account.points + delta}, synchronize_session=False
+    )
+    db.add(models.PointsLedger(
+        account_id=account_id,
+        challenge_id=challenge_id,
+        delta=delta,
+        reason="completed" if completed else "failed"
+    ))
+    db.commit()
+    invalidate_account(account_id)
+
+    db_account = get_account(db, account_id)
+    if db_account:
+        leaderboard.set_points(account_id, db_account.points)
+    return db_account
+
+def accept_challenges(db: Session, account_id: int, challenge_ids: list[int]):
+    if get_account(db, account_id) is None:
+        return [{"id": id, "ok": False, "detail": "Account not found."} for id in challenge_ids]
+
+    known = {id for (id,) in db.query(models.Challenge.id).filter(models.Challenge.id.in_(challenge_ids))}
+    accepted = {id for (id,) in db.query(models.ChallengeStatus.challenge_id).filter(
         models.ChallengeStatus.account_id == account_id,
-        models.ChallengeStatus.challenge_id == challenge_id
+        models.ChallengeStatus.challenge_id.in_(challenge_ids)
+    )}
+
+    results = []
+    rows = []
+    for id in challenge_ids:
+        if id not in known:
+            results.append({"id": id, "ok": False, "detail": "Challenge not found."})
+        elif id in accepted:
+            results.append({"id": id, "ok": False, "detail": "Challenge already accepted."})
+        else:
+            accepted.add(id)
+            rows.append({"account_id": account_id, "challenge_id": id, "completed": False, "failed": False})
+            results.append({"id": id, "ok": True})
+    if rows:
+        try:
+            db.execute(models.ChallengeStatus.__table__.insert(), rows)
+            db.commit()
+        except IntegrityError:
+            # A concurrent accept inserted one of these first; redo the batch against the committed rows
+            db.rollback()
+            return accept_challenges(db, account_id, challenge_ids)
+        challenge_eligibility.mark_seen(account_id, [r["challenge_id"] for r in rows])
+    return results
+
+def get_open_challenge_status(db: Session, account_id: int, challenge_id: int):
+    # The accepted, not yet completed or failed status row for this account and challenge
+    return db.query(models.ChallengeStatus).filter(
+        models.ChallengeStatus.account_id == account_id,
+        models.ChallengeStatus.challenge_id == challenge_id,
+        models.ChallengeStatus.completed == False,
+        models.ChallengeStatus.failed == False
     ).first()
-    if db_challenge_status:
-        if db_challenge_status.completed:
-            raise Exception("Challenge cannot be failed because it has already been completed.")
-        db_challenge_status.failed = True
-        db.commit()
-        db.refresh(db_challenge_status)
-        db_account = get_account(db, account_id)
-        db_account.points -= db_challenge_status.challenge.points
-        db.commit()
-        return db_account
-    return None
+
+def complete_challenge(db: Session, account_id: int, challenge_id: int):
+    return _resolve_challenge(db, account_id, challenge_id, completed=True)
+
+def fail_challenge(db: Session, account_id: int, challenge_id: int):
+    return _resolve_challenge(db, account_id, challenge_id, completed=False)
+
+def get_accounts_by_ids(db: Session, ids):
+    # Accounts for the given ids in the same order, skipping ids that no longer exist
+    if not ids:
+        return []
+    accounts = {a.id: a for a in db.query(models.Account).options(raiseload('*')).filter(models.Account.id.in_(ids)).all()}
+    return [accounts[id] for id in ids if id in accounts]
 
 def get_friends(db: Session, account_id: int):
-    account = db.query(models.Account).filter(models.Account.id == account_id).first()
-    return account.friends if account else []
+    return get_accounts_by_ids(db, list(friend_graph.friends(db, account_id)))
+
+def get_friend_suggestions(db: Session, account_id: int, limit: int = 10):
+    suggestions = friend_graph.suggestions(db, account_id, limit=limit)
+    mutual = dict(suggestions)
+    return [
+        {**schemas.AccountSummary.model_validate(a).model_dump(), "mutual_friends": mutual[a.id]}
+        for a in get_accounts_by_ids(db, [id for id, _ in suggestions])
+    ]
+
+def get_friend_leaderboard(db: Session, account_id: int, limit: int = 100):
+    # Rank the caller and their friends by the points held in the in-memory leaderboard
+    leaderboard.load(db)
+    if leaderboard.points(account_id) is None:
+        return None
+    key = lambda id: (-(leaderboard.points(id) or 0), id)
+    ids = list(friend_graph.friends(db, account_id))
+    ids.append(account_id)
+    mine = key(account_id)
+    rank = sum(1 for id in ids if key(id) < mine) + 1
+    page = heapq.nsmallest(limit, ids, key=key)
+    entries = [
+        {**schemas.AccountSummary.model_validate(a).model_dump(), "rank": i + 1}
+        for i, a in enumerate(get_accounts_by_ids(db, page))
+    ]
+    return {"rank": rank, "total": len(ids), "entries": entries}
+
+def search_accounts_by_username(db: Session, username: str, limit: int = 20, after_id: int = None):
+    # Rank matches in the in-memory username index, then fetch just that page of accounts by id
+    username_index.load(db)
+    return get_accounts_by_ids(db, username_index.search(username, limit=limit, after_id=after_id))
 
-def search_accounts_by_username(db: Session, username: str):
-    return db.query(models.Account).filter(models.Account.username.contains(username)).all()
+def get_accounts_by_points(db: Session, skip: int = 0, limit: int = 10, after: tuple = None):
+    # Page through the in-memory leaderboard, then fetch just that page of accounts by id
+    leaderboard.load(db)
+    return get_accounts_by_ids(db, leaderboard.page(skip=skip, limit=limit, after=after))
 
-def get_accounts_by_points(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(models.Account).order_by(models.Account.points.desc()).offset(skip).limit(limit).all()
+def get_account_rank(db: Session, account_id: int):
+    leaderboard.load(db)
+    rank = leaderboard.rank(account_id)
+    if rank is None:
+        return None
+    return {"account_id": account_id, "points": leaderboard.points(account_id), "rank": rank, "total": leaderboard.size()}
 
 def send_friend_request(db: Session, sender_id: int, receiver_id: int):
     if sender_id == receiver_id:
@@ -164,7 +369,7 @@ def send_friend_request(db: Session, sender_id: int, receiver_id: int):
         raise Exception("Friend request already sent.")
     
     # Create a new friend request
-    db.add(models.friend_requests.insert().values(sender_id=sender_id, receiver_id=receiver_id))
+    db.execute(models.friend_requests.insert().values(sender_id=sender_id, receiver_id=receiver_id))
     db.commit()
     return {"message": "Friend request sent."}
 
@@ -182,8 +387,8 @@ def accept_friend_request(db: Session, sender_id: int, receiver_id: int):
         raise Exception("Friend request not found.")
     
     # Add the friendship
-    db.add(models.friends.insert().values(account_id=sender_id, friend_id=receiver_id))
-    db.add(models.friends.insert().values(account_id=receiver_id, friend_id=sender_id))
+    db.execute(models.friends.insert().values(account_id=sender_id, friend_id=receiver_id))
+    db.execute(models.friends.insert().values(account_id=receiver_id, friend_id=sender_id))
     
     # Remove the friend request
     db.query(models.friend_requests).filter(
@@ -192,8 +397,93 @@ def accept_friend_request(db: Session, sender_id: int, receiver_id: int):
     ).delete()
     
     db.commit()
+    friend_graph.add_friendship(sender_id, receiver_id)
     return {"message": "Friend request accepted and friendship established."}
 
+def _friends_among(db: Session, account_id: int, ids):
+    # The subset of `ids` already friends with account_id
+    if not ids:
+        return set()
+    return {id for (id,) in db.query(models.friends.c.friend_id).filter(
+        models.friends.c.account_id == account_id,
+        models.friends.c.friend_id.in_(ids)
+    )}
+
+def send_friend_requests(db: Session, sender_id: int, receiver_ids: list[int]):
+    if get_account(db, sender_id) is None:
+        return [{"id": id, "ok": False, "detail": "Account not found."} for id in receiver_ids]
+
+    known = {id for (id,) in db.query(models.Account.id).filter(models.Account.id.in_(receiver_ids))}
+    pending = {id for (id,) in db.query(models.friend_requests.c.receiver_id).filter(
+        models.friend_requests.c.sender_id == sender_id,
+        models.friend_requests.c.receiver_id.in_(receiver_ids)
+    )}
+    friends = _friends_among(db, sender_id, receiver_ids)
+
+    results = []
+    rows = []
+    for id in receiver_ids:
+        if id == sender_id:
+            results.append({"id": id, "ok": False, "detail": "Cannot send a friend request to yourself."})
+        elif id not in known:
+            results.append({"id": id, "ok": False, "detail": "Account not found."})
+        elif id in friends:
+            results.append({"id": id, "ok": False, "detail": "Already friends."})
+        elif id in pending:
+            results.append({"id": id, "ok": False, "detail": "Friend request already sent."})
+        else:
+            pending.add(id)
+            rows.append({"sender_id": sender_id, "receiver_id": id})
+            results.append({"id": id, "ok": True})
+    if rows:
+        try:
+            db.execute(models.friend_requests.insert(), rows)
+            db.commit()
+        except IntegrityError:
+            # A concurrent request inserted one of these first; redo the batch against the committed rows
+            db.rollback()
+            return send_friend_requests(db, sender_id, receiver_ids)
+    return results
+
+def accept_friend_requests(db: Session, receiver_id: int, sender_ids: list[int]):
+    pending = {id for (id,) in db.query(models.friend_requests.c.sender_id).filter(
+        models.friend_requests.c.receiver_id == receiver_id,
+        models.friend_requests.c.sender_id.in_(sender_ids)
+    )}
+    # Mutual requests: once one side is accepted, the other one would insert the friendship again
+    friends = _friends_among(db, receiver_id, pending)
+
+    results = []
+    accepted = []
+    for id in sender_ids:
+        if id in friends:
+            results.append({"id": id, "ok": False, "detail": "Already friends."})
+        elif id in pending:
+            pending.discard(id)
+            accepted.append(id)
+            results.append({"id": id, "ok": True})
+        else:
+            results.append({"id": id, "ok": False, "detail": "Friend request not found."})
+    if accepted:
+        rows = []
+        for id in accepted:
+            rows.append({"account_id": id, "friend_id": receiver_id})
+            rows.append({"account_id": receiver_id, "friend_id": id})
+        try:
+            db.execute(models.friends.insert(), rows)
+            db.execute(models.friend_requests.delete().where(
+                models.friend_requests.c.receiver_id == receiver_id,
+                models.friend_requests.c.sender_id.in_(accepted)
+            ))
+            db.commit()
+        except IntegrityError:
+            # A concurrent accept made one of these friendships first; redo the batch against the committed rows
+            db.rollback()
+            return accept_friend_requests(db, receiver_id, sender_ids)
+        for id in accepted:
+            friend_graph.add_friendship(id, receiver_id)
+    return results
+
 def reject_friend_request(db: Session, sender_id: int, receiver_id: int):
     if sender_id == receiver_id:
         raise Exception("Cannot reject a friend request from yourself.")
@@ -216,12 +506,52 @@ def reject_friend_request(db: Session, sender_id: int, receiver_id: int):
     db.commit()
     return {"message": "Friend request rejected."}
 
-def get_sent_friend_requests(db: Session, account_id: int):
-    return db.query(models.Account).join(
-        models.friend_requests, models.friend_requests.c.receiver_id == account_id
-    ).filter(models.friend_requests.c.sender_id == account_id).all()
+def get_sent_friend_requests(db: Session, account_id: int, limit: int = 50, after_id: int = None):
+    # Outbox: served by the (sender_id, receiver_id) primary key
+    query = db.query(models.Account).options(raiseload('*')).join(
+        models.friend_requests, models.friend_requests.c.receiver_id == models.Account.id
+    ).filter(models.friend_requests.c.sender_id == account_id)
+    if after_id is not None:
+        query = query.filter(models.friend_requests.c.receiver_id > after_id)
+    return query.order_by(models.friend_requests.c.receiver_id).limit(limit).all()
+
+def get_received_friend_requests(db: Session, account_id: int, limit: int = 50, after_id: int = None):
+    # Inbox: served by the (receiver_id, sender_id) index
+    query = db.query(models.Account).options(raiseload('*')).join(
+        models.friend_requests, models.friend_requests.c.sender_id == models.Account.id
+    ).filter(models.friend_requests.c.receiver_id == account_id)
+    if after_id is not None:
+        query = query.filter(models.friend_requests.c.sender_id > after_id)
+    return query.order_by(models.friend_requests.c.sender_id).limit(limit).all()
+
+def get_friend_request_counts(db: Session, account_id: int):
+    sent = db.query(func.count()).select_from(models.friend_requests).filter(
+        models.friend_requests.c.sender_id == account_id
+    ).scalar()
+    received = db.query(func.count()).select_from(models.friend_requests).filter(
+        models.friend_requests.c.receiver_id == account_id
+    ).scalar()
+    return {"sent": sent, "received": received}
 
-def get_received_friend_requests(db: Session, account_id: int):
-    return db.query(models.Account).join(
-        models.friend_requests, models.friend_requests.c.sender_id == account_id
-    ).filter(models.friend_requests.c.receiver_id == account_id).all()
+def get_verdict(db: Session, key: str, max_age: float):
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age)
+    db_verdict = db.query(models.Verdict).filter(
+        models.Verdict.key == key,
+        models.Verdict.created_at >= cutoff
+    ).first()
+    return db_verdict.verdict if db_verdict else None
+
+def save_verdict(db: Session, key: str, verdict: str):
+    db.merge(models.Verdict(key=key, verdict=verdict, created_at=datetime.utcnow()))
+    db.commit()
+
+def purge_verdicts(db: Session, max_age: float, max_rows: int):
+    # Delete expired verdicts, then the oldest beyond max_rows; both ranges are served by ix_verdicts_created_at
+    deleted = db.query(models.Verdict).filter(
+        models.Verdict.created_at < datetime.utcnow() - timedelta(seconds=max_age)
+    ).delete(synchronize_session=False)
+    oldest_kept = db.query(models.Verdict.created_at).order_by(models.Verdict.created_at.desc()).offset(max_rows - 1).limit(1).scalar()
+    if oldest_kept is not None:
+        deleted += db.query(models.Verdict).filter(models.Verdict.created_at < oldest_kept).delete(synchronize_session=False)
+    db.commit()
+    return deleted
@@ -1,3 +1,5 @@
+-- Full schema at the latest migration (see migrations/ and migrate.py).
+-- Keep in sync with models.py and the newest file in migrations/.
 CREATE DATABASE aura;
 
 USE aura;
@@ -5,7 +7,9 @@ USE aura;
 CREATE TABLE challenges (
     id INT PRIMARY KEY AUTO_INCREMENT,
     description VARCHAR(1000),
-    points INT
+    points INT,
+    UNIQUE INDEX ix_challenges_description (description(768)),
+    INDEX ix_challenges_points (points)
 );
 
 CREATE TABLE accounts (
@@ -15,7 +19,10 @@ CREATE TABLE accounts (
     password VARCHAR(255) NOT NULL,  
     points INT DEFAULT 0,
     first_name VARCHAR(100),
-    last_name VARCHAR(100)
+    last_name VARCHAR(100),
+    UNIQUE INDEX ix_accounts_username (username),
+    UNIQUE INDEX ix_accounts_email (email),
+    INDEX ix_accounts_points_id (points DESC, id)
 );
 
 CREATE TABLE challenge_status (
@@ -32,6 +39,45 @@ CREATE TABLE friends (
     account_id INT,
     friend_id INT,
     PRIMARY KEY(account_id, friend_id),
+    INDEX ix_friends_friend_id (friend_id, account_id),
     FOREIGN KEY(account_id) REFERENCES accounts(id),
     FOREIGN KEY(friend_id) REFERENCES accounts(id)
 );
+
+CREATE TABLE friend_requests (
+    sender_id INT,
+    receiver_id INT,
+    PRIMARY KEY(sender_id, receiver_id),
+    INDEX ix_friend_requests_receiver_id (receiver_id, sender_id),
+    FOREIGN KEY(sender_id) REFERENCES accounts(id),
+    FOREIGN KEY(receiver_id) REFERENCES accounts(id)
+);
+
+CREATE TABLE points_ledger (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    account_id INT,
+    challenge_id INT,
+    delta INT,
+    reason VARCHAR(20),
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX ix_points_ledger_account_id (account_id),
+    FOREIGN KEY(account_id) REFERENCES accounts(id),
+    FOREIGN KEY(challenge_id) REFERENCES challenges(id)
+);
+
+CREATE TABLE verdicts (
+    `key` CHAR(64) PRIMARY KEY,
+    verdict VARCHAR(255),
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX ix_verdicts_created_at (created_at)
+);
+
+CREATE TABLE schema_migrations (
+    version INT PRIMARY KEY,
+    name VARCHAR(255),
+    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO schema_migrations (version, name) VALUES
+    (1, '0001_initial.sql'),
+    (2, '0002_sync_with_models.sql');
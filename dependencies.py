@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session
 from fastapi import Depends
-from database import SessionLocal
+from database import SessionLocal, AsyncSessionLocal
 
 def get_db():
     db = SessionLocal()
@@ -8,3 +8,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
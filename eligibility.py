@@ -0,0 +1,147 @@
+import os
+import random
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from threading import Lock
+from sqlalchemy.orm import Session
+import models
+
+ELIGIBILITY_CACHE_SIZE = int(os.getenv("ELIGIBILITY_CACHE_SIZE", "100000"))
+# Random probes into the points range before falling back to enumerating it. A probe is one bisect,
+# so even an account that has seen 90% of the range falls back on only 0.9^64 (about 0.1%) of picks.
+ELIGIBILITY_PROBES = int(os.getenv("ELIGIBILITY_PROBES", "64"))
+# The catalog and each seen set are reloaded after this many seconds, to pick up challenges created
+# and accepted through other processes
+ELIGIBILITY_TTL = float(os.getenv("ELIGIBILITY_TTL", "60"))
+
+def _contains(ids: array, id: int) -> bool:
+    i = bisect_left(ids, id)
+    return i < len(ids) and ids[i] == id
+
+class ChallengeEligibility:
+    # The challenge catalog as a sorted list of (points, id), plus an LRU of each account's seen
+    # challenge ids (accepted, completed or failed) as a sorted array('i'). A challenge is eligible
+    # when it is in the points range and not seen, since challenge_status allows one row per pair.
+    def __init__(self, maxsize: int = ELIGIBILITY_CACHE_SIZE, ttl: float = ELIGIBILITY_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = Lock()
+        self._catalog = []
+        self._catalog_loaded_at = None
+        # Catalog reloads in flight and the challenges created meanwhile, replayed onto each new catalog
+        self._catalog_reloading = 0
+        self._pending = []
+        self._seen = OrderedDict()
+        self._expires = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _catalog_ready(self) -> bool:
+        # Fresh, or expired with a reload already under way (the old catalog is served meanwhile)
+        if self._catalog_loaded_at is None:
+            return False
+        return self._catalog_reloading > 0 or time.monotonic() - self._catalog_loaded_at < self.ttl
+
+    def _load_catalog(self, db: Session):
+        with self._lock:
+            if self._catalog_ready():
+                return
+            self._catalog_reloading += 1
+        try:
+            started = time.monotonic()
+            rows = db.query(models.Challenge.points, models.Challenge.id).all()
+            catalog = sorted((points or 0, id) for points, id in rows)
+            with self._lock:
+                self._catalog = catalog
+                self._catalog_loaded_at = started
+                for key in self._pending:
+                    i = bisect_left(catalog, key)
+                    if i == len(catalog) or catalog[i] != key:
+                        catalog.insert(i, key)
+        finally:
+            with self._lock:
+                self._catalog_reloading -= 1
+                if not self._catalog_reloading:
+                    self._pending = []
+
+    def peek(self, account_id: int):
+        # Seen ids if everything needed for a pick is cached, otherwise None (see `seen`)
+        with self._lock:
+            if not self._catalog_ready():
+                return None
+            ids = self._seen.get(account_id)
+            if ids is None or self._expires[account_id] < time.monotonic():
+                return None
+            self._seen.move_to_end(account_id)
+            self.hits += 1
+            return ids
+
+    def seen(self, db: Session, account_id: int) -> array:
+        self._load_catalog(db)
+        ids = self.peek(account_id)
+        if ids is not None:
+            return ids
+        rows = db.query(models.ChallengeStatus.challenge_id).filter(models.ChallengeStatus.account_id == account_id)
+        ids = array('i', sorted(id for (id,) in rows))
+        with self._lock:
+            self.misses += 1
+            self._seen[account_id] = ids
+            self._seen.move_to_end(account_id)
+            self._expires[account_id] = time.monotonic() + self.ttl
+            while len(self._seen) > self.maxsize:
+                id, _ = self._seen.popitem(last=False)
+                del self._expires[id]
+        return ids
+
+    def pick(self, seen: array, min_points: int, max_points: int):
+        # Random unseen challenge id within [min_points, max_points], or None
+        with self._lock:
+            lo = bisect_left(self._catalog, (min_points, -1))
+            hi = bisect_right(self._catalog, (max_points, float("inf")))
+            if lo >= hi:
+                return None
+            # Most accounts have seen a small share of the range, so a few probes usually land
+            for _ in range(ELIGIBILITY_PROBES):
+                id = self._catalog[random.randrange(lo, hi)][1]
+                if not _contains(seen, id):
+                    return id
+            entries = self._catalog[lo:hi]
+        # Long histories: one pass over the range outside the lock, rather than a bisect per entry
+        candidates = list({id for _, id in entries}.difference(seen))
+        return random.choice(candidates) if candidates else None
+
+    def add_challenge(self, challenge_id: int, points: int):
+        with self._lock:
+            if self._catalog_reloading:
+                self._pending.append((points or 0, challenge_id))
+            if self._catalog_loaded_at is not None:
+                insort(self._catalog, (points or 0, challenge_id))
+
+    def mark_seen(self, account_id: int, challenge_ids):
+        with self._lock:
+            ids = self._seen.get(account_id)
+            if ids is None:
+                # Loaded from challenge_status, which already has the new rows, on the next pick
+                return
+            for id in challenge_ids:
+                i = bisect_left(ids, id)
+                if i == len(ids) or ids[i] != id:
+                    ids.insert(i, id)
+
+    def remove_account(self, account_id: int):
+        with self._lock:
+            if self._seen.pop(account_id, None) is not None:
+                del self._expires[account_id]
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._seen),
+            "maxsize": self.maxsize,
+            "catalog": len(self._catalog)
+        }
+
+challenge_eligibility = ChallengeEligibility()
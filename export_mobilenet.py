@@ -0,0 +1,154 @@
+"""Export MobileNetV2 to INT8 TFLite and ONNX models for NetMobileV2.py and check their accuracy.
+
+Calibrates post-training quantization on a folder of representative photos, writes the models and
+the ImageNet labels to MODEL_DIR, then compares every backend with the Keras float32 reference on a
+held-out sample and exits non-zero if top-1 agreement falls below --min-agreement:
+
+    python export_mobilenet.py --images photos/ --output parity.json
+    python export_mobilenet.py --images photos/ --parity-only
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import numpy as np
+import inference
+from image_ingest import load_array
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", required=True, help="Folder of representative photos (searched recursively)")
+    parser.add_argument("--calibration-samples", type=int, default=200)
+    parser.add_argument("--parity-samples", type=int, default=200)
+    parser.add_argument("--min-agreement", type=float, default=0.95, help="Required top-1 agreement with Keras")
+    parser.add_argument("--backends", default="tflite,onnx", help="Backends to export and check")
+    parser.add_argument("--parity-only", action="store_true", help="Skip the export, check existing models")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the parity report here instead of stdout")
+    return parser.parse_args()
+
+def list_images(folder: str):
+    paths = []
+    for root, _, files in os.walk(folder):
+        paths.extend(os.path.join(root, f) for f in files if f.lower().endswith(IMAGE_EXTENSIONS))
+    return sorted(paths)
+
+def load_images(paths):
+    for path in paths:
+        with open(path, "rb") as f:
+            yield load_array(f.read(), (224, 224))
+
+def export_tflite(model, calibration, path: str):
+    import tensorflow as tf
+
+    def representative_dataset():
+        for x in calibration:
+            yield [inference.preprocess(x[np.newaxis])]
+
+    # Full-integer weights and activations; float input/output keep the serving code backend-agnostic
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8, tf.lite.OpsSet.TFLITE_BUILTINS]
+    with open(path, "wb") as f:
+        f.write(converter.convert())
+
+def export_onnx(model, calibration, path: str):
+    import tensorflow as tf
+    import tf2onnx
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    root, ext = os.path.splitext(path)
+    float_path = root + "_float32" + ext
+    spec = (tf.TensorSpec((None, 224, 224, 3), tf.float32, name="input"),)
+    tf2onnx.convert.from_keras(model, input_signature=spec, opset=13, output_path=float_path)
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.batches = iter({"input": inference.preprocess(x[np.newaxis])} for x in calibration)
+
+        def get_next(self):
+            return next(self.batches, None)
+
+    quantize_static(
+        float_path, path, Reader(),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8
+    )
+
+def save_class_index(path: str):
+    from tensorflow.keras.utils import get_file
+    source = get_file(
+        "imagenet_class_index.json",
+        "https://storage.googleapis.com/download.tensorflow.org/data/imagenet_class_index.json",
+        cache_subdir="models"
+    )
+    shutil.copyfile(source, path)
+
+def parity(reference: np.ndarray, preds: np.ndarray):
+    ref_top1 = reference.argmax(axis=1)
+    top1 = preds.argmax(axis=1)
+    top5 = np.argsort(preds, axis=1)[:, -5:]
+    return {
+        "samples": len(reference),
+        "top1_agreement": float(np.mean(top1 == ref_top1)),
+        "reference_top1_in_top5": float(np.mean([r in t for r, t in zip(ref_top1, top5)])),
+        "mean_abs_error": float(np.mean(np.abs(preds - reference)))
+    }
+
+def predict_all(backend, images, batch_size: int = 16):
+    return np.concatenate([backend.predict(images[i:i + batch_size]) for i in range(0, len(images), batch_size)])
+
+def run():
+    args = parse_args()
+    backends = [b for b in args.backends.split(",") if b]
+    for name in backends:
+        if name not in ("tflite", "onnx"):
+            sys.exit(f"Cannot export backend {name!r}, expected tflite or onnx")
+
+    paths = list_images(args.images)
+    if not paths:
+        sys.exit(f"No images found under {args.images}")
+    random.Random(args.seed).shuffle(paths)
+    # Calibration and parity images are disjoint so the check is not flattered by the calibration set
+    calibration_paths = paths[:args.calibration_samples]
+    parity_paths = paths[args.calibration_samples:args.calibration_samples + args.parity_samples] or calibration_paths
+
+    keras = inference.KerasBackend()
+    if not args.parity_only:
+        os.makedirs(inference.MODEL_DIR, exist_ok=True)
+        calibration = list(load_images(calibration_paths))
+        save_class_index(inference.CLASS_INDEX_PATH)
+        if "tflite" in backends:
+            export_tflite(keras.model, calibration, inference.TFLITE_MODEL_PATH)
+        if "onnx" in backends:
+            export_onnx(keras.model, calibration, inference.ONNX_MODEL_PATH)
+
+    images = np.stack(list(load_images(parity_paths)))
+    reference = predict_all(keras, images)
+    report = {"min_agreement": args.min_agreement, "backends": {}}
+    for name in backends:
+        result = parity(reference, predict_all(inference.load_backend(name), images))
+        result["path"] = inference.TFLITE_MODEL_PATH if name == "tflite" else inference.ONNX_MODEL_PATH
+        result["size_bytes"] = os.path.getsize(result["path"])
+        report["backends"][name] = result
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    failed = [name for name, r in report["backends"].items() if r["top1_agreement"] < args.min_agreement]
+    if failed:
+        sys.exit(f"Top-1 agreement below {args.min_agreement} for: {', '.join(failed)}")
+
+if __name__ == '__main__':
+    run()
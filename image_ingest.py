@@ -0,0 +1,76 @@
+import os
+from io import BytesIO
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(15 * 1024 * 1024)))
+# Whole request body: the image plus room for multipart headers and form fields
+MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_BYTES", str(MAX_UPLOAD_BYTES + 64 * 1024)))
+JPEG_QUALITY = int(os.getenv("JPEG_QUALITY", "85"))
+
+class UploadLimit:
+    # ASGI middleware capping request bodies before Starlette parses them: multipart forms are spooled to
+    # disk in full before the handler runs, so read_upload alone would only reject an upload after receiving it.
+    # A declared Content-Length over the cap is refused up front; a chunked body is cut off once it passes it.
+    def __init__(self, app, max_bytes: int = MAX_REQUEST_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_bytes:
+            response = JSONResponse({"detail": f"Request body larger than {self.max_bytes} bytes"}, status_code=413)
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside body parsing; FastAPI re-raises HTTPExceptions from there as responses
+                    raise HTTPException(status_code=413, detail=f"Request body larger than {self.max_bytes} bytes")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+async def read_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> bytes:
+    # The body is already capped by UploadLimit; this caps the file part itself, reading it once
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Image larger than {max_bytes} bytes")
+    data = await file.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Image larger than {max_bytes} bytes")
+    return data
+
+def open_image(data: bytes, size: tuple):
+    # Decode at the smallest scale that still covers `size`; JPEG draft mode skips most of the full-resolution work
+    from PIL import Image, ImageOps, UnidentifiedImageError
+    try:
+        img = Image.open(BytesIO(data))
+        img.draft('RGB', size)
+        return ImageOps.exif_transpose(img).convert('RGB')
+    except Image.DecompressionBombError:
+        # A small file declaring huge pixel dimensions
+        raise HTTPException(status_code=400, detail="Image dimensions too large")
+    except (UnidentifiedImageError, OSError):
+        raise HTTPException(status_code=400, detail="Invalid image")
+
+def downscale(data: bytes, max_side: int) -> tuple:
+    # Fit the image within max_side x max_side and re-encode it as a compact JPEG
+    img = open_image(data, (max_side, max_side))
+    img.thumbnail((max_side, max_side))
+    out = BytesIO()
+    img.save(out, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+    return out.getvalue(), 'image/jpeg'
+
+def load_array(data: bytes, size: tuple = (224, 224)):
+    # Float32 HxWx3 array at exactly `size`, ready for a vision model
+    import numpy as np
+    from PIL import Image
+    img = open_image(data, size).resize(size, Image.BILINEAR)
+    return np.asarray(img, dtype=np.float32)
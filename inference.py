@@ -0,0 +1,132 @@
+import json
+import os
+import numpy as np
+
+# Which MobileNetV2 runtime serves /predict in NetMobileV2.py: "keras" (float32 reference),
+# "tflite" or "onnx" (INT8 models written by export_mobilenet.py)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "keras")
+MODEL_DIR = os.getenv("MODEL_DIR", "model_artifacts")
+TFLITE_MODEL_PATH = os.getenv("TFLITE_MODEL_PATH", os.path.join(MODEL_DIR, "mobilenet_v2_int8.tflite"))
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", os.path.join(MODEL_DIR, "mobilenet_v2_int8.onnx"))
+CLASS_INDEX_PATH = os.getenv("CLASS_INDEX_PATH", os.path.join(MODEL_DIR, "imagenet_class_index.json"))
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", str(os.cpu_count() or 1)))
+
+BACKENDS = ("keras", "tflite", "onnx")
+
+def preprocess(inputs: np.ndarray) -> np.ndarray:
+    # Same scaling as keras' mobilenet_v2.preprocess_input, without importing TensorFlow
+    return (inputs.astype(np.float32) / 127.5) - 1.0
+
+# Every backend takes a batch of raw 0-255 NHWC float32 images and returns (N, 1000) class scores
+class KerasBackend:
+    name = "keras"
+
+    def __init__(self):
+        from tensorflow.keras.applications.mobilenet_v2 import MobileNetV2
+        self.model = MobileNetV2(weights='imagenet')
+
+    def predict(self, inputs: np.ndarray) -> np.ndarray:
+        return self.model.predict(preprocess(inputs), batch_size=len(inputs), verbose=0)
+
+class TFLiteBackend:
+    name = "tflite"
+
+    def __init__(self, path: str = TFLITE_MODEL_PATH, threads: int = INFERENCE_THREADS):
+        # The standalone runtime is a few MB; fall back to the interpreter bundled with TensorFlow
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        self.interpreter = Interpreter(model_path=path, num_threads=threads)
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch_size = self.input["shape"][0]
+
+    def predict(self, inputs: np.ndarray) -> np.ndarray:
+        if len(inputs) != self.batch_size:
+            self.interpreter.resize_tensor_input(self.input["index"], [len(inputs), *self.input["shape"][1:]])
+            self.interpreter.allocate_tensors()
+            self.input = self.interpreter.get_input_details()[0]
+            self.output = self.interpreter.get_output_details()[0]
+            self.batch_size = len(inputs)
+
+        x = preprocess(inputs)
+        scale, zero_point = self.input["quantization"]
+        if scale:
+            # Fully integer model: quantize the input with the model's own parameters
+            x = np.clip(np.round(x / scale + zero_point), *_limits(self.input["dtype"]))
+        self.interpreter.set_tensor(self.input["index"], x.astype(self.input["dtype"]))
+        self.interpreter.invoke()
+
+        y = self.interpreter.get_tensor(self.output["index"])
+        scale, zero_point = self.output["quantization"]
+        if scale:
+            y = (y.astype(np.float32) - zero_point) * scale
+        return y
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, path: str = ONNX_MODEL_PATH, threads: int = INFERENCE_THREADS):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, inputs: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: preprocess(inputs)})[0]
+
+def _limits(dtype):
+    info = np.iinfo(dtype)
+    return info.min, info.max
+
+def load_backend(name: str = INFERENCE_BACKEND):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {name!r}, expected one of {', '.join(BACKENDS)}")
+    # Labels are loaded with the model, off the event loop, so /predict only ever reads them
+    load_class_index(name)
+    if name == "keras":
+        return KerasBackend()
+    if name == "tflite":
+        return TFLiteBackend()
+    return OnnxBackend()
+
+_class_index = None
+
+def load_class_index(backend: str = INFERENCE_BACKEND):
+    # ImageNet labels; export_mobilenet.py saves them next to the models so serving does not need TensorFlow.
+    # Only the keras backend, which imports TensorFlow anyway, falls back to downloading them.
+    global _class_index
+    if _class_index is None:
+        path = CLASS_INDEX_PATH
+        if not os.path.exists(path):
+            if backend != "keras":
+                raise FileNotFoundError(
+                    f"ImageNet class index not found at {path}; run export_mobilenet.py or set CLASS_INDEX_PATH"
+                )
+            from tensorflow.keras.utils import get_file
+            path = get_file(
+                "imagenet_class_index.json",
+                "https://storage.googleapis.com/download.tensorflow.org/data/imagenet_class_index.json",
+                cache_subdir="models"
+            )
+        with open(path) as f:
+            _class_index = {int(k): v for k, v in json.load(f).items()}
+    return _class_index
+
+def class_index():
+    if _class_index is None:
+        raise RuntimeError("ImageNet class index not loaded; call load_backend or load_class_index first")
+    return _class_index
+
+def decode_predictions(preds: np.ndarray, top: int = 5):
+    # (class, label, score) tuples per image, like keras' decode_predictions
+    labels = class_index()
+    results = []
+    for pred in preds:
+        best = np.argsort(pred)[::-1][:top]
+        results.append([(*labels[i], float(pred[i])) for i in best])
+    return results
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+
+VERIFY_WORKERS = int(os.getenv("VERIFY_WORKERS", "4"))
+VERIFY_QUEUE_SIZE = int(os.getenv("VERIFY_QUEUE_SIZE", "1000"))
+# Finished jobs are kept this many seconds for clients to poll their result
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "3600"))
+
+class QueueFull(Exception):
+    pass
+
+class Job:
+    def __init__(self, account_id: int, challenge_id: int):
+        self.id = uuid.uuid4().hex
+        self.account_id = account_id
+        self.challenge_id = challenge_id
+        self.status = "queued"
+        self.verdict = None
+        self.detail = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.done = asyncio.Event()
+
+    def as_dict(self):
+        return {
+            "job_id": self.id,
+            "account_id": self.account_id,
+            "challenge_id": self.challenge_id,
+            "status": self.status,
+            "verdict": self.verdict,
+            "detail": self.detail
+        }
+
+class JobQueue:
+    # In-process stand-in for a broker: a bounded asyncio queue drained by `workers` tasks that run
+    # `handler(job, payload)`. The handler sets the job's verdict/status; exceptions mark it as "error".
+    def __init__(self, handler, workers: int = VERIFY_WORKERS, queue_size: int = VERIFY_QUEUE_SIZE, retention: float = JOB_RETENTION):
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+        self.retention = retention
+        self._queue = None
+        self._tasks = []
+        self._jobs = OrderedDict()
+
+    def submit(self, account_id: int, challenge_id: int, payload) -> Job:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        job = Job(account_id, challenge_id)
+        try:
+            self._queue.put_nowait((job, payload))
+        except asyncio.QueueFull:
+            raise QueueFull("Verification queue is full, try again later.")
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str):
+        return self._jobs.get(job_id)
+
+    async def wait(self, job: Job, timeout: float):
+        # Long-poll: return once the job finishes or the timeout passes, whichever is first
+        if timeout > 0 and not job.done.is_set():
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    async def _work(self):
+        while True:
+            job, payload = await self._queue.get()
+            job.status = "running"
+            try:
+                await self.handler(job, payload)
+            except Exception as e:
+                job.status = "error"
+                job.detail = str(e)
+            finally:
+                job.finished_at = time.time()
+                job.done.set()
+                self._queue.task_done()
+                self._evict()
+
+    def _evict(self):
+        cutoff = time.time() - self.retention
+        while self._jobs:
+            job = next(iter(self._jobs.values()))
+            if job.finished_at is None or job.finished_at > cutoff:
+                break
+            self._jobs.popitem(last=False)
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "tracked": len(self._jobs),
+            "workers": self.workers,
+            "queue_size": self.queue_size
+        }
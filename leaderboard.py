@@ -0,0 +1,105 @@
+import os
+import time
+from bisect import bisect_left, bisect_right, insort
+from threading import Lock
+from sqlalchemy.orm import Session
+import models
+
+# Rebuild from the accounts table this often, to pick up changes made by other processes
+LEADERBOARD_TTL = float(os.getenv("LEADERBOARD_TTL", "60"))
+
+class Leaderboard:
+    # Rank-ordered view of account points, kept as a sorted list of (-points, id) keys.
+    # Writes in this process are applied in place; the whole view is reloaded every `ttl` seconds.
+    def __init__(self, ttl: float = LEADERBOARD_TTL):
+        self.ttl = ttl
+        self._lock = Lock()
+        self._keys = []
+        self._points = {}
+        self._loaded_at = None
+        # Reload queries in flight (several only on a cold start), and the local writes made meanwhile,
+        # which are replayed onto each new view
+        self._reloading = 0
+        self._pending = {}
+
+    @property
+    def loaded(self):
+        # True while the view is fresh; callers then skip load()
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def load(self, db: Session):
+        # The query runs outside the lock: under AsyncSession.run_sync it yields to the event loop,
+        # and a second cold request blocking on a held threading.Lock would stall the loop thread.
+        # Once loaded, a single request refreshes an expired view while the others keep reading it.
+        with self._lock:
+            if self.loaded or (self._loaded_at is not None and self._reloading):
+                return
+            self._reloading += 1
+        try:
+            started = time.monotonic()
+            rows = db.query(models.Account.id, models.Account.points).all()
+            points = {id: points or 0 for id, points in rows}
+            keys = sorted((-p, id) for id, p in points.items())
+            with self._lock:
+                self._points = points
+                self._keys = keys
+                self._loaded_at = started
+                for account_id, p in self._pending.items():
+                    self._remove(account_id)
+                    if p is not None:
+                        self._points[account_id] = p
+                        insort(self._keys, (-p, account_id))
+        finally:
+            with self._lock:
+                self._reloading -= 1
+                if not self._reloading:
+                    self._pending = {}
+
+    def set_points(self, account_id: int, points: int):
+        with self._lock:
+            if self._reloading:
+                self._pending[account_id] = points
+            if self._loaded_at is None:
+                return
+            self._remove(account_id)
+            self._points[account_id] = points
+            insort(self._keys, (-points, account_id))
+
+    def remove(self, account_id: int):
+        with self._lock:
+            if self._reloading:
+                self._pending[account_id] = None
+            if self._loaded_at is not None:
+                self._remove(account_id)
+
+    def _remove(self, account_id: int):
+        points = self._points.pop(account_id, None)
+        if points is not None:
+            i = bisect_left(self._keys, (-points, account_id))
+            if i < len(self._keys) and self._keys[i] == (-points, account_id):
+                del self._keys[i]
+
+    def rank(self, account_id: int):
+        # 1-based rank, or None if the account is unknown
+        with self._lock:
+            points = self._points.get(account_id)
+            if points is None:
+                return None
+            return bisect_left(self._keys, (-points, account_id)) + 1
+
+    def points(self, account_id: int):
+        return self._points.get(account_id)
+
+    def page(self, skip: int = 0, limit: int = 10, after: tuple = None):
+        # Account ids ordered by points, by offset and/or after a (points, id) position (keyset)
+        with self._lock:
+            start = skip
+            if after is not None:
+                points, id = after
+                start += bisect_right(self._keys, (-points, id))
+            return [id for _, id in self._keys[start:start + limit]]
+
+    def size(self):
+        return len(self._keys)
+
+leaderboard = Leaderboard()
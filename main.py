@@ -1,48 +1,61 @@
-from fastapi import FastAPI, HTTPException, Depends, File, UploadFile
+from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Query, Body, Response
 from fastapi.responses import JSONResponse
-from IPython.display import Markdown
 from sqlalchemy.orm import Session
-import google.generativeai as genai
-import PIL.Image
-from io import BytesIO
-import textwrap
-from database import SessionLocal, engine
-import crud, models, schemas
-from IPython.display import Markdown
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import itertools
+import os
+from database import SessionLocal, AsyncSessionLocal, pool_metrics
+import crud, async_crud, schemas
+from verification import (
+    Verifier, VerifierSaturated, verdict_cache, verdict_key,
+    VERDICT_CACHE_SQL, VERDICT_CACHE_TTL, VERDICT_CACHE_SQL_ROWS, VERDICT_PURGE_EVERY
+)
+from cache import caches
+from social_graph import friend_graph
+from eligibility import challenge_eligibility
+from image_ingest import UploadLimit, read_upload, downscale
+from pagination import encode_cursor, decode_cursor
+from jobs import JobQueue, QueueFull
+from credentials import hash_password, verify_password
+import metrics
+from fastapi.concurrency import run_in_threadpool
 
 from fastapi.middleware.cors import CORSMiddleware
 
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
-
 app = FastAPI()
 
+# Inside CORS so that 413s still carry the CORS headers
+app.add_middleware(UploadLimit)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # List of allowed origins (you can use ["*"] for all origins)
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Next-Cursor"],  # Cursor for the next page of list endpoints
 )
 
+# Per-route latency and SQL query histograms, served on GET /metrics
+metrics.install(app)
 
 
-# Configure Gemini API
-genai.configure(api_key=API_KEY)
 
-# Find a suitable model
-model_name = None
-for m in genai.list_models():
-    if 'generateContent' in m.supported_generation_methods:
-        model_name = m.name
-        print(m.name)
-        break
+VERIFY_RETRIES = int(os.getenv("VERIFY_RETRIES", "5"))
+MAX_BULK_ITEMS = int(os.getenv("MAX_BULK_ITEMS", "1000"))
 
-if model_name is None:
-    raise ValueError("No suitable model found for content generation.")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+# Longest side of the image sent to Gemini; larger uploads are downscaled before the call
+GEMINI_IMAGE_SIZE = int(os.getenv("GEMINI_IMAGE_SIZE", "768"))
 
-model = genai.GenerativeModel('gemini-1.5-flash')
+# The Gemini client is only imported and configured when the first verification needs it
+def load_model():
+    import google.generativeai as genai
+    genai.configure(api_key=os.getenv("API_KEY"))
+    return genai.GenerativeModel(GEMINI_MODEL)
+
+verifier = Verifier(load_model)
 
 # Dependency to get the database session
 def get_db():
@@ -52,9 +65,41 @@ def get_db():
     finally:
         db.close()
 
-def to_markdown(text):
-    text = text.replace('•', '  *')
-    return Markdown(textwrap.indent(text, '> ', predicate=lambda _: True))
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Persistent tier of the verdict cache, used when VERDICT_CACHE_SQL=1
+verdict_sql_stats = {"hits": 0, "misses": 0, "purged": 0}
+verdict_stores = itertools.count()
+
+def load_verdict(key: str):
+    db = SessionLocal()
+    try:
+        return crud.get_verdict(db, key, VERDICT_CACHE_TTL)
+    finally:
+        db.close()
+
+def get_open_challenge(account_id: int, challenge_id: int):
+    # (challenge description, whether the account has it open), or None if the challenge does not exist
+    db = SessionLocal()
+    try:
+        db_challenge = crud.get_challenge(db, challenge_id)
+        if db_challenge is None:
+            return None
+        return db_challenge.description, crud.get_open_challenge_status(db, account_id, challenge_id) is not None
+    finally:
+        db.close()
+
+def store_verdict(key: str, verdict: str):
+    db = SessionLocal()
+    try:
+        crud.save_verdict(db, key, verdict)
+        # Reads only filter out expired rows, so the table is trimmed here, starting with the first store
+        if next(verdict_stores) % VERDICT_PURGE_EVERY == 0:
+            verdict_sql_stats["purged"] += crud.purge_verdicts(db, VERDICT_CACHE_TTL, VERDICT_CACHE_SQL_ROWS)
+    finally:
+        db.close()
 
 @app.get("/")
 def read_root():
@@ -65,12 +110,33 @@ async def test_connection():
     return {"message": "Connection successful"}
 
 # CRUD operations for accounts
+# Signup and login are async so the scrypt work in the credentials process pool is awaited instead of
+# holding a threadpool thread; database calls and serialization still run in the threadpool
+def account_response(db_account):
+    return schemas.Account.model_validate(db_account)
+
 @app.post("/accounts/", response_model=schemas.Account)
-def create_account(account: schemas.AccountCreate, db: Session = Depends(get_db)):
-    db_account = crud.get_account_by_email(db, email=account.email)
+async def create_account(account: schemas.AccountCreate, db: Session = Depends(get_db)):
+    db_account = await run_in_threadpool(crud.get_account_by_email, db, email=account.email)
     if db_account:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_account(db=db, user=account)
+    password_hash = await hash_password(account.password)
+    db_account = await run_in_threadpool(crud.create_account, db, account, password_hash)
+    return await run_in_threadpool(account_response, db_account)
+
+@app.post("/accounts/login", response_model=schemas.Account)
+async def login(credentials: schemas.AccountLogin, db: Session = Depends(get_db)):
+    db_account = await run_in_threadpool(crud.get_account_for_login, db, credentials.email)
+    if db_account is None:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    matches, needs_rehash = await verify_password(credentials.password, db_account.password)
+    if not matches:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    if needs_rehash:
+        # Stored with older cost parameters (or in plaintext); upgrade it while we have the password
+        password_hash = await hash_password(credentials.password)
+        db_account = await run_in_threadpool(crud.update_account_password, db, db_account, password_hash)
+    return await run_in_threadpool(account_response, db_account)
 
 @app.get("/accounts/me/", response_model=schemas.Account)
 def read_account_me(email: str, db: Session = Depends(get_db)):
@@ -79,9 +145,13 @@ def read_account_me(email: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Account not found")
     return db_account
 
-@app.get("/accounts/", response_model=list[schemas.Account])
-def read_accounts(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    return crud.get_accounts(db, skip=skip, limit=limit)
+@app.get("/accounts/", response_model=list[schemas.AccountSummary])
+async def read_accounts(response: Response, skip: int = 0, limit: int = 10, cursor: str = None, db: AsyncSession = Depends(get_async_db)):
+    after_id = decode_cursor(cursor, 1)[0] if cursor else None
+    accounts = await async_crud.get_accounts(db, skip=skip, limit=limit, after_id=after_id)
+    if accounts and len(accounts) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(accounts[-1].id)
+    return accounts
 
 @app.delete("/accounts/{account_id}")
 def delete_account(account_id: int, db: Session = Depends(get_db)):
@@ -107,9 +177,13 @@ def update_email(account_id: int, email_update: schemas.AccountUpdateEmail, db:
         raise HTTPException(status_code=404, detail="Account not found")
     return db_account
 
-@app.get("/challenges/", response_model=list[schemas.Challenge])
-def read_challenges(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    return crud.get_challenges(db, skip=skip, limit=limit)
+@app.get("/challenges/", response_model=list[schemas.ChallengeSummary])
+async def read_challenges(response: Response, skip: int = 0, limit: int = 10, cursor: str = None, db: AsyncSession = Depends(get_async_db)):
+    after_id = decode_cursor(cursor, 1)[0] if cursor else None
+    challenges = await async_crud.get_challenges(db, skip=skip, limit=limit, after_id=after_id)
+    if challenges and len(challenges) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(challenges[-1].id)
+    return challenges
 
 @app.post("/challenges/", response_model=schemas.Challenge)
 def create_challenge(challenge: schemas.ChallengeCreate, db: Session = Depends(get_db)):
@@ -117,27 +191,64 @@ def create_challenge(challenge: schemas.ChallengeCreate, db: Session = Depends(g
 
 @app.post("/accounts/{account_id}/accept_challenge/{challenge_id}", response_model=schemas.ChallengeStatus)
 def accept_challenge(account_id: int, challenge_id: int, db: Session = Depends(get_db)):
-    return crud.accept_challenge(db, account_id, challenge_id)
+    try:
+        return crud.accept_challenge(db, account_id, challenge_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/accounts/{account_id}/complete_challenge/{challenge_id}", response_model=schemas.Account)
 def complete_challenge(account_id: int, challenge_id: int, db: Session = Depends(get_db)):
-    return crud.complete_challenge(db, account_id, challenge_id)
+    try:
+        db_account = crud.complete_challenge(db, account_id, challenge_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if db_account is None:
+        raise HTTPException(status_code=404, detail="Challenge not accepted")
+    return db_account
 
 @app.post("/accounts/{account_id}/fail_challenge/{challenge_id}", response_model=schemas.Account)
 def fail_challenge(account_id: int, challenge_id: int, db: Session = Depends(get_db)):
-    return crud.fail_challenge(db, account_id, challenge_id)
+    try:
+        db_account = crud.fail_challenge(db, account_id, challenge_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if db_account is None:
+        raise HTTPException(status_code=404, detail="Challenge not accepted")
+    return db_account
 
-@app.get("/accounts/{account_id}/friends", response_model=list[schemas.Account])
+@app.get("/accounts/{account_id}/friends", response_model=list[schemas.AccountSummary])
 def get_friends(account_id: int, db: Session = Depends(get_db)):
     return crud.get_friends(db, account_id)
 
-@app.get("/accounts/search/", response_model=list[schemas.Account])
-def search_accounts(username: str, db: Session = Depends(get_db)):
-    return crud.search_accounts_by_username(db, username)
-
-@app.get("/accounts/leaderboard", response_model=list[schemas.Account])
-def get_leaderboard(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    return crud.get_accounts_by_points(db, skip=skip, limit=limit)
+@app.get("/accounts/{account_id}/friends/leaderboard", response_model=schemas.FriendLeaderboard)
+def get_friend_leaderboard(account_id: int, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    board = crud.get_friend_leaderboard(db, account_id, limit=limit)
+    if board is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+    return board
+
+@app.get("/accounts/{account_id}/friends/suggestions", response_model=list[schemas.FriendSuggestion])
+def get_friend_suggestions(account_id: int, limit: int = Query(10, ge=1, le=100), db: Session = Depends(get_db)):
+    return crud.get_friend_suggestions(db, account_id, limit=limit)
+
+@app.get("/accounts/search/", response_model=list[schemas.AccountSummary])
+def search_accounts(username: str, limit: int = Query(20, ge=1, le=100), after_id: int = None, db: Session = Depends(get_db)):
+    return crud.search_accounts_by_username(db, username, limit=limit, after_id=after_id)
+
+@app.get("/accounts/leaderboard", response_model=list[schemas.AccountSummary])
+async def get_leaderboard(response: Response, skip: int = 0, limit: int = 10, cursor: str = None, db: AsyncSession = Depends(get_async_db)):
+    after = tuple(decode_cursor(cursor, 2)) if cursor else None
+    accounts = await async_crud.get_accounts_by_points(db, skip=skip, limit=limit, after=after)
+    if accounts and len(accounts) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(accounts[-1].points, accounts[-1].id)
+    return accounts
+
+@app.get("/accounts/{account_id}/rank", response_model=schemas.AccountRank)
+async def get_account_rank(account_id: int, db: AsyncSession = Depends(get_async_db)):
+    rank = await async_crud.get_account_rank(db, account_id)
+    if rank is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+    return rank
 
 @app.post("/accounts/{sender_id}/send_friend_request/{receiver_id}")
 def send_friend_request(sender_id: int, receiver_id: int, db: Session = Depends(get_db)):
@@ -160,40 +271,165 @@ def reject_friend_request(sender_id: int, receiver_id: int, db: Session = Depend
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/accounts/{account_id}/sent_friend_requests")
-def get_sent_friend_requests(account_id: int, db: Session = Depends(get_db)):
-    return crud.get_sent_friend_requests(db, account_id)
-
-@app.get("/accounts/{account_id}/received_friend_requests")
-def get_received_friend_requests(account_id: int, db: Session = Depends(get_db)):
-    return crud.get_received_friend_requests(db, account_id)
-
-@app.get("/accounts/{account_id}/get_challenge", response_model=schemas.Challenge)
-def get_challenge_for_user(account_id: int, min_points: int, max_points: int, db: Session = Depends(get_db)):
-    challenge = crud.get_available_challenge(db, account_id, min_points, max_points)
+@app.get("/accounts/{account_id}/sent_friend_requests", response_model=list[schemas.AccountSummary])
+def get_sent_friend_requests(account_id: int, response: Response, limit: int = Query(50, ge=1, le=200), cursor: str = None, db: Session = Depends(get_db)):
+    after_id = decode_cursor(cursor, 1)[0] if cursor else None
+    accounts = crud.get_sent_friend_requests(db, account_id, limit=limit, after_id=after_id)
+    if accounts and len(accounts) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(accounts[-1].id)
+    return accounts
+
+@app.get("/accounts/{account_id}/received_friend_requests", response_model=list[schemas.AccountSummary])
+def get_received_friend_requests(account_id: int, response: Response, limit: int = Query(50, ge=1, le=200), cursor: str = None, db: Session = Depends(get_db)):
+    after_id = decode_cursor(cursor, 1)[0] if cursor else None
+    accounts = crud.get_received_friend_requests(db, account_id, limit=limit, after_id=after_id)
+    if accounts and len(accounts) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(accounts[-1].id)
+    return accounts
+
+@app.get("/accounts/{account_id}/friend_requests/counts", response_model=schemas.FriendRequestCounts)
+def get_friend_request_counts(account_id: int, db: Session = Depends(get_db)):
+    return crud.get_friend_request_counts(db, account_id)
+
+@app.get("/accounts/{account_id}/get_challenge", response_model=schemas.ChallengeSummary)
+async def get_challenge_for_user(account_id: int, min_points: int, max_points: int, db: AsyncSession = Depends(get_async_db)):
+    challenge = await async_crud.get_available_challenge(db, account_id, min_points, max_points)
     if not challenge:
         raise HTTPException(status_code=404, detail="No available challenge found within the specified points range.")
     return challenge  
 
+async def verify_image(contents: bytes, description: str) -> str:
+    # Duplicate submissions of the same photo for the same challenge are answered from the cache
+    key = verdict_key(contents, description)
+    text = verdict_cache.get(key)
+    if text is None and VERDICT_CACHE_SQL:
+        text = await run_in_threadpool(load_verdict, key)
+        verdict_sql_stats["hits" if text is not None else "misses"] += 1
+        if text is not None:
+            verdict_cache.set(key, text)
+    if text is not None:
+        return text
+
+    data, mime_type = await run_in_threadpool(downscale, contents, GEMINI_IMAGE_SIZE)
+    text = await verifier.verify(description, mime_type, data)
+    verdict_cache.set(key, text)
+    if VERDICT_CACHE_SQL:
+        await run_in_threadpool(store_verdict, key, text)
+    return text
+
 @app.post('/predict')
 async def predict(file: UploadFile = File(...), description: str = None):
     if description is None:
         raise HTTPException(status_code=400, detail="Challenge description is required")
 
-    # Read image file
-    contents = await file.read()
-    img = PIL.Image.open(BytesIO(contents))
+    # Read image file, rejecting uploads over the size cap
+    contents = await read_upload(file)
 
-    # Prepare API request
     try:
-        response = model.generate_content([description + "respond with ONLY yes or no. does the image match the previous statement?", {
-            'mime_type': file.content_type,
-            'data': contents
-        }])
-        return JSONResponse(content={'predictions': response.text})
+        text = await verify_image(contents, description)
+        return JSONResponse(content={'predictions': text})
+    except HTTPException:
+        raise
+    except VerifierSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Model call timed out")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
+# Asynchronous verification: the photo is queued, a worker runs the model and applies the verdict
+def apply_verdict(account_id: int, challenge_id: int, passed: bool):
+    db = SessionLocal()
+    try:
+        if passed:
+            return crud.complete_challenge(db, account_id, challenge_id)
+        return crud.fail_challenge(db, account_id, challenge_id)
+    finally:
+        db.close()
+
+async def run_verification_job(job, payload):
+    contents, description = payload
+    for attempt in range(VERIFY_RETRIES):
+        try:
+            text = await verify_image(contents, description)
+            break
+        except VerifierSaturated:
+            # Interactive /predict traffic has the model slots; back off and retry
+            await asyncio.sleep(2 ** attempt)
+    else:
+        raise VerifierSaturated("Model is saturated, verification not attempted.")
+
+    passed = text.strip().lower().startswith("yes")
+    job.verdict = "yes" if passed else "no"
+    if await run_in_threadpool(apply_verdict, job.account_id, job.challenge_id, passed) is None:
+        raise Exception("Challenge not accepted")
+    job.status = "completed" if passed else "failed"
+
+verification_jobs = JobQueue(run_verification_job)
+
+@app.post("/accounts/{account_id}/challenges/{challenge_id}/verify", status_code=202, response_model=schemas.VerificationJob)
+async def submit_verification(account_id: int, challenge_id: int, file: UploadFile = File(...)):
+    # Only queue a (paid) model call for a challenge the account has accepted and not resolved yet
+    challenge = await run_in_threadpool(get_open_challenge, account_id, challenge_id)
+    if challenge is None:
+        raise HTTPException(status_code=404, detail="Challenge not found")
+    description, is_open = challenge
+    if not is_open:
+        raise HTTPException(status_code=404, detail="Challenge not accepted")
+    contents = await read_upload(file)
+    try:
+        job = verification_jobs.submit(account_id, challenge_id, (contents, description))
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return job.as_dict()
+
+@app.get("/jobs/{job_id}", response_model=schemas.VerificationJob)
+async def get_verification_job(job_id: str, wait: float = Query(0, ge=0, le=30)):
+    job = verification_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    await verification_jobs.wait(job, wait)
+    return job.as_dict()
+
+@app.get("/metrics/cache")
+def cache_metrics():
+    stats = {name: cache.stats() for name, cache in caches.items()}
+    stats["friend_graph"] = friend_graph.stats()
+    stats["challenge_eligibility"] = challenge_eligibility.stats()
+    if VERDICT_CACHE_SQL:
+        stats["verdicts_sql"] = dict(verdict_sql_stats)
+    stats["verification_jobs"] = verification_jobs.stats()
+    return stats
+
+@app.get("/metrics/db_pool")
+def db_pool_metrics():
+    return pool_metrics()
+
+# Batch operations: one transaction per call, with a result for every item in input order
+def check_bulk_size(items: list):
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ITEMS} items per request")
+
+@app.post("/challenges/bulk", response_model=list[schemas.BulkResult])
+def create_challenges(challenges: list[schemas.ChallengeCreate], db: Session = Depends(get_db)):
+    check_bulk_size(challenges)
+    return crud.create_challenges(db, challenges)
+
+@app.post("/accounts/{account_id}/accept_challenges", response_model=list[schemas.BulkResult])
+def accept_challenges(account_id: int, challenge_ids: list[int] = Body(...), db: Session = Depends(get_db)):
+    check_bulk_size(challenge_ids)
+    return crud.accept_challenges(db, account_id, challenge_ids)
+
+@app.post("/accounts/{sender_id}/send_friend_requests", response_model=list[schemas.BulkResult])
+def send_friend_requests(sender_id: int, receiver_ids: list[int] = Body(...), db: Session = Depends(get_db)):
+    check_bulk_size(receiver_ids)
+    return crud.send_friend_requests(db, sender_id, receiver_ids)
+
+@app.post("/accounts/{receiver_id}/accept_friend_requests", response_model=list[schemas.BulkResult])
+def accept_friend_requests(receiver_id: int, sender_ids: list[int] = Body(...), db: Session = Depends(get_db)):
+    check_bulk_size(sender_ids)
+    return crud.accept_friend_requests(db, receiver_id, sender_ids)
+
 # Run the application
 if __name__ == '__main__':
     import uvicorn
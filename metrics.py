@@ -0,0 +1,144 @@
+import logging
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+
+# Log every SQL statement slower than this many milliseconds; 0 disables the slow-query log
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+
+logger = logging.getLogger("aura.slow_query")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+registry = []
+
+def _labels(labels: tuple, extra: str = None) -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Histogram:
+    # Prometheus-style cumulative histogram, one series per label set
+    def __init__(self, name: str, help: str, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._series = {}
+        self._lock = Lock()
+        registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            i = bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_labels(key, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_labels(key, le)} {count}")
+                lines.append(f"{self.name}_sum{_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_labels(key)} {count}")
+        return lines
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._series = {}
+        self._lock = Lock()
+        registry.append(self)
+
+    def inc(self, value: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._series.items()):
+                lines.append(f"{self.name}{_labels(key)} {value}")
+        return lines
+
+request_seconds = Histogram("http_request_duration_seconds", "HTTP request latency by route")
+request_queries = Histogram("http_request_sql_queries", "SQL queries issued per HTTP request", buckets=COUNT_BUCKETS)
+request_sql_seconds = Histogram("http_request_sql_seconds", "Time spent in SQL per HTTP request")
+sql_seconds = Histogram("sql_query_duration_seconds", "SQL statement latency")
+slow_queries = Counter("sql_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS")
+model_seconds = Histogram("model_call_duration_seconds", "Model inference latency")
+
+# Per-request SQL counters; the middleware sets a fresh dict, the engine hooks mutate it
+request_stats = ContextVar("request_stats", default=None)
+
+def instrument_engine(engine):
+    # Time every statement on a (sync) engine; pass AsyncEngine.sync_engine for async engines
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        sql_seconds.observe(elapsed)
+        stats = request_stats.get()
+        if stats is not None:
+            stats["queries"] += 1
+            stats["sql_time"] += elapsed
+        if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+            slow_queries.inc()
+            logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, statement)
+
+async def record_request(request: Request, call_next):
+    stats = {"queries": 0, "sql_time": 0.0}
+    token = request_stats.set(stats)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Query-Count"] = str(stats["queries"])
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        # Label by route template, not raw path, to keep the series count bounded
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        request_seconds.observe(elapsed, method=request.method, route=path, status=status)
+        request_queries.observe(stats["queries"], method=request.method, route=path)
+        request_sql_seconds.observe(stats["sql_time"], method=request.method, route=path)
+        request_stats.reset(token)
+
+def render() -> str:
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+def install(app: FastAPI):
+    # Record per-route latency and query counts, and serve everything on GET /metrics
+    app.middleware("http")(record_request)
+
+    @app.get("/metrics", include_in_schema=False)
+    def read_metrics():
+        return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,59 @@
+import argparse
+from pathlib import Path
+from sqlalchemy import text
+from database import engine
+import models
+
+# Versioned schema migrations. Each migrations/NNNN_name.sql file is applied once, in order, and recorded
+# in schema_migrations. When adding one, update models.py and database_setup.sql (the full schema at the
+# latest version) in the same change so the three stay consistent.
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+def migrations():
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        yield int(path.name.split("_", 1)[0]), path
+
+def statements(sql: str):
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+def applied_versions():
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INT PRIMARY KEY, name VARCHAR(255), applied_at DATETIME DEFAULT CURRENT_TIMESTAMP)"
+        ))
+        return {version for (version,) in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+def record(version: int, path: Path):
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"), {"version": version, "name": path.name})
+
+def migrate(baseline: int = None):
+    # Apply pending migrations; versions up to `baseline` are only recorded, for databases that already have them
+    applied = applied_versions()
+    for version, path in migrations():
+        if version in applied:
+            continue
+        if baseline is None or version > baseline:
+            # MySQL commits DDL implicitly, so each migration is recorded only after all its statements succeed
+            with engine.begin() as conn:
+                for statement in statements(path.read_text()):
+                    conn.execute(text(statement))
+            print(f"Applied {path.name}")
+        record(version, path)
+
+def create_all():
+    # Development/test profile (e.g. SQLite): build the schema from models.py and mark it as fully migrated
+    models.Base.metadata.create_all(bind=engine)
+    migrate(baseline=max(version for version, _ in migrations()))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Apply database schema migrations")
+    parser.add_argument("--baseline", type=int, help="Record migrations up to this version as applied without running them")
+    parser.add_argument("--create-all", action="store_true", help="Create the schema from models.py instead of running SQL migrations")
+    args = parser.parse_args()
+    if args.create_all or engine.url.get_backend_name() == "sqlite":
+        create_all()
+    else:
+        migrate(baseline=args.baseline)
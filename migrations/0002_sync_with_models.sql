@@ -0,0 +1,42 @@
+-- Bring the schema in line with models.py: friend requests, unique and lookup indexes,
+-- points ledger and verdict cache tables
+
+-- Deployments that ran the old main.py already have friend_requests, created by create_all at
+-- import, but not its receiver index
+CREATE TABLE IF NOT EXISTS friend_requests (
+    sender_id INT,
+    receiver_id INT,
+    PRIMARY KEY(sender_id, receiver_id),
+    FOREIGN KEY(sender_id) REFERENCES accounts(id),
+    FOREIGN KEY(receiver_id) REFERENCES accounts(id)
+);
+
+CREATE INDEX ix_friend_requests_receiver_id ON friend_requests (receiver_id, sender_id);
+
+CREATE INDEX ix_friends_friend_id ON friends (friend_id, account_id);
+
+CREATE UNIQUE INDEX ix_accounts_username ON accounts (username);
+CREATE UNIQUE INDEX ix_accounts_email ON accounts (email);
+CREATE INDEX ix_accounts_points_id ON accounts (points DESC, id);
+
+CREATE UNIQUE INDEX ix_challenges_description ON challenges (description(768));
+CREATE INDEX ix_challenges_points ON challenges (points);
+
+CREATE TABLE points_ledger (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    account_id INT,
+    challenge_id INT,
+    delta INT,
+    reason VARCHAR(20),
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX ix_points_ledger_account_id (account_id),
+    FOREIGN KEY(account_id) REFERENCES accounts(id),
+    FOREIGN KEY(challenge_id) REFERENCES challenges(id)
+);
+
+CREATE TABLE verdicts (
+    `key` CHAR(64) PRIMARY KEY,
+    verdict VARCHAR(255),
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX ix_verdicts_created_at (created_at)
+);
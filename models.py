@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Table, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Table, Boolean, DateTime, Index, func
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -7,7 +7,8 @@ friends = Table(
     'friends',
     Base.metadata,
     Column('account_id', Integer, ForeignKey('accounts.id'), primary_key=True),
-    Column('friend_id', Integer, ForeignKey('accounts.id'), primary_key=True)
+    Column('friend_id', Integer, ForeignKey('accounts.id'), primary_key=True),
+    Index('ix_friends_friend_id', 'friend_id', 'account_id')
 )
 
 # Table for friend requests
@@ -15,19 +16,21 @@ friend_requests = Table(
     'friend_requests',
     Base.metadata,
     Column('sender_id', Integer, ForeignKey('accounts.id'), primary_key=True),
-    Column('receiver_id', Integer, ForeignKey('accounts.id'), primary_key=True)
+    Column('receiver_id', Integer, ForeignKey('accounts.id'), primary_key=True),
+    # Inbox lookups by receiver; the primary key already covers the outbox
+    Index('ix_friend_requests_receiver_id', 'receiver_id', 'sender_id')
 )
 
 class Account(Base):
     __tablename__ = "accounts"
 
     id = Column(Integer, primary_key=True, index=True)
-    username = Column(String, unique=True, index=True)
-    email = Column(String, unique=True, index=True)
-    password = Column(String)
+    username = Column(String(50), unique=True, index=True)
+    email = Column(String(100), unique=True, index=True)
+    password = Column(String(255))
     points = Column(Integer, default=0)
-    first_name = Column(String, nullable=True)
-    last_name = Column(String, nullable=True)
+    first_name = Column(String(100), nullable=True)
+    last_name = Column(String(100), nullable=True)
 
     accepted_challenges = relationship(
         'ChallengeStatus',
@@ -55,18 +58,24 @@ class Account(Base):
         secondaryjoin=id == friend_requests.c.sender_id
     )
 
+# Leaderboard order (points DESC, id ASC) for keyset pagination
+Index('ix_accounts_points_id', Account.points.desc(), Account.id)
+
 class Challenge(Base):
     __tablename__ = "challenges"
 
     id = Column(Integer, primary_key=True, index=True)
-    description = Column(String, unique=True, index=True)
-    points = Column(Integer)
+    description = Column(String(1000))
+    points = Column(Integer, index=True)
 
     completed_by = relationship(
         'ChallengeStatus',
         back_populates='challenge'
     )
 
+# MySQL caps index keys at 3072 bytes, so uniqueness is enforced on the first 768 characters
+Index('ix_challenges_description', Challenge.description, unique=True, mysql_length=768)
+
 class ChallengeStatus(Base):
     __tablename__ = "challenge_status"
 
@@ -77,3 +86,20 @@ class ChallengeStatus(Base):
 
     account = relationship('Account', back_populates='accepted_challenges')
     challenge = relationship('Challenge', back_populates='completed_by')
+
+class PointsLedger(Base):
+    __tablename__ = "points_ledger"
+
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey('accounts.id'), index=True)
+    challenge_id = Column(Integer, ForeignKey('challenges.id'))
+    delta = Column(Integer)
+    reason = Column(String(20))
+    created_at = Column(DateTime, server_default=func.now())
+
+class Verdict(Base):
+    __tablename__ = "verdicts"
+
+    key = Column(String(64), primary_key=True)
+    verdict = Column(String(255))
+    created_at = Column(DateTime, server_default=func.now(), index=True)
@@ -0,0 +1,17 @@
+import base64
+import json
+from fastapi import HTTPException
+
+# Opaque keyset cursors: the seek values of the last row on a page, base64-encoded JSON
+
+def encode_cursor(*values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(v, int) for v in values):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
@@ -9,15 +9,50 @@ class AccountBase(BaseModel):
 class AccountCreate(AccountBase):
     password: str  
 
+class AccountLogin(BaseModel):
+    email: str
+    password: str
+
+class AccountSummary(BaseModel):
+    id: int
+    username: str
+    first_name: str = None
+    last_name: str = None
+    points: int = 0
+
+    class Config:
+        from_attributes = True
+
+class FriendSuggestion(AccountSummary):
+    mutual_friends: int
+
 class Account(AccountBase):
     id: int
     points: int = 0
     completed_challenges: list['ChallengeStatus'] = []
-    friends: list['Account'] = []
+    friends: list[AccountSummary] = []
 
     class Config:
         from_attributes = True
 
+class AccountRank(BaseModel):
+    account_id: int
+    points: int
+    rank: int
+    total: int
+
+class LeaderboardEntry(AccountSummary):
+    rank: int
+
+class FriendLeaderboard(BaseModel):
+    rank: int
+    total: int
+    entries: list[LeaderboardEntry]
+
+class FriendRequestCounts(BaseModel):
+    sent: int
+    received: int
+
 class AccountUpdateUsername(BaseModel):
     username: str = Field(..., min_length=3, max_length=50)
     
@@ -31,6 +66,12 @@ class ChallengeBase(BaseModel):
 class ChallengeCreate(ChallengeBase):
     pass
 
+class ChallengeSummary(ChallengeBase):
+    id: int
+
+    class Config:
+        from_attributes = True
+
 class Challenge(ChallengeBase):
     id: int
     completed_by: list['ChallengeStatus'] = []
@@ -38,6 +79,19 @@ class Challenge(ChallengeBase):
     class Config:
         from_attributes = True
 
+class BulkResult(BaseModel):
+    id: int | None = None
+    ok: bool
+    detail: str | None = None
+
+class VerificationJob(BaseModel):
+    job_id: str
+    account_id: int
+    challenge_id: int
+    status: str
+    verdict: str | None = None
+    detail: str | None = None
+
 class ChallengeStatus(BaseModel):
     account_id: int
     challenge_id: int
@@ -0,0 +1,142 @@
+import heapq
+import os
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from threading import Lock
+from sqlalchemy.orm import Session
+import models
+
+# Rebuild from the accounts table this often, to pick up usernames changed by other processes
+USERNAME_INDEX_TTL = float(os.getenv("USERNAME_INDEX_TTL", "60"))
+
+def trigrams(name: str):
+    return {name[i:i + 3] for i in range(len(name) - 2)}
+
+class UsernameIndex:
+    # Case-insensitive username search: a sorted (name, id) list answers prefix queries and
+    # a trigram posting index answers substring queries of three or more characters.
+    # Results are ranked prefix matches first, then other substring matches, each by (name, id).
+    # Writes in this process are applied in place; the whole index is rebuilt every `ttl` seconds.
+    def __init__(self, ttl: float = USERNAME_INDEX_TTL):
+        self.ttl = ttl
+        self._lock = Lock()
+        self._names = {}
+        self._sorted = []
+        self._grams = defaultdict(set)
+        self._loaded_at = None
+        # Rebuilds in flight and the local writes made meanwhile, replayed onto each new index
+        self._reloading = 0
+        self._pending = {}
+
+    @property
+    def loaded(self):
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def load(self, db: Session):
+        # Built outside the lock into a fresh index, then swapped in; once loaded, one request
+        # rebuilds an expired index while the others keep searching the old one
+        with self._lock:
+            if self.loaded or (self._loaded_at is not None and self._reloading):
+                return
+            self._reloading += 1
+        try:
+            started = time.monotonic()
+            fresh = UsernameIndex(self.ttl)
+            for id, username in db.query(models.Account.id, models.Account.username).yield_per(10000):
+                if username:
+                    fresh._index(id, username.lower())
+            fresh._sorted.sort()
+            with self._lock:
+                self._names, self._sorted, self._grams = fresh._names, fresh._sorted, fresh._grams
+                self._loaded_at = started
+                for account_id, username in self._pending.items():
+                    self._unindex(account_id)
+                    if username:
+                        self._index(account_id, username, keep_sorted=True)
+        finally:
+            with self._lock:
+                self._reloading -= 1
+                if not self._reloading:
+                    self._pending = {}
+
+    def add(self, account_id: int, username: str):
+        with self._lock:
+            if not username:
+                return
+            if self._reloading:
+                self._pending[account_id] = username.lower()
+            if self._loaded_at is not None:
+                self._unindex(account_id)
+                self._index(account_id, username.lower(), keep_sorted=True)
+
+    def remove(self, account_id: int):
+        with self._lock:
+            if self._reloading:
+                self._pending[account_id] = None
+            if self._loaded_at is not None:
+                self._unindex(account_id)
+
+    def _index(self, account_id: int, name: str, keep_sorted: bool = False):
+        self._names[account_id] = name
+        if keep_sorted:
+            self._sorted.insert(bisect_left(self._sorted, (name, account_id)), (name, account_id))
+        else:
+            self._sorted.append((name, account_id))
+        for gram in trigrams(name):
+            self._grams[gram].add(account_id)
+
+    def _unindex(self, account_id: int):
+        name = self._names.pop(account_id, None)
+        if name is None:
+            return
+        i = bisect_left(self._sorted, (name, account_id))
+        if i < len(self._sorted) and self._sorted[i] == (name, account_id):
+            del self._sorted[i]
+        for gram in trigrams(name):
+            postings = self._grams.get(gram)
+            if postings is not None:
+                postings.discard(account_id)
+                if not postings:
+                    del self._grams[gram]
+
+    def search(self, query: str, limit: int = 20, after_id: int = None):
+        # Account ids matching `query`, optionally continuing after a previously returned account
+        q = query.lower()
+        if not q or limit <= 0:
+            return []
+        with self._lock:
+            after = None
+            if after_id is not None:
+                name = self._names.get(after_id)
+                if name is None or q not in name:
+                    return []
+                after = (0 if name.startswith(q) else 1, name, after_id)
+
+            results = []
+            if after is None or after[0] == 0:
+                start = bisect_right(self._sorted, after[1:]) if after else bisect_left(self._sorted, (q,))
+                for name, id in self._sorted[start:start + limit]:
+                    if not name.startswith(q):
+                        break
+                    results.append(id)
+
+            if len(results) == limit or len(q) < 3:
+                return results
+            grams = sorted((self._grams.get(gram, set()) for gram in trigrams(q)), key=len)
+            candidates = set(grams[0]).intersection(*grams[1:])
+            names = self._names
+
+        # Substring phase outside the lock: short queries can match a large share of all accounts, and
+        # only the page needs ordering. Accounts removed meanwhile are skipped; a reload swaps in a new
+        # dict and leaves this one intact.
+        matches = (
+            (name, id) for id in candidates
+            if (name := names.get(id)) is not None and q in name and not name.startswith(q)
+        )
+        if after is not None and after[0] == 1:
+            matches = (match for match in matches if match > after[1:])
+        results.extend(id for _, id in heapq.nsmallest(limit - len(results), matches))
+        return results
+
+username_index = UsernameIndex()
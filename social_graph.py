@@ -0,0 +1,104 @@
+import heapq
+import os
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from threading import Lock
+from sqlalchemy.orm import Session
+import models
+
+FRIEND_GRAPH_CACHE_SIZE = int(os.getenv("FRIEND_GRAPH_CACHE_SIZE", "100000"))
+# Friend lists are reloaded after this many seconds, to pick up friendships made by other processes
+FRIEND_GRAPH_TTL = float(os.getenv("FRIEND_GRAPH_TTL", "60"))
+
+class FriendGraph:
+    # LRU cache of the friends table: each account's friend ids as a sorted array('i'),
+    # loaded on first access, patched in place when friendships change and reloaded after `ttl` seconds
+    def __init__(self, maxsize: int = FRIEND_GRAPH_CACHE_SIZE, ttl: float = FRIEND_GRAPH_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = Lock()
+        self._adjacency = OrderedDict()
+        self._expires = {}
+        self.hits = 0
+        self.misses = 0
+
+    def friends(self, db: Session, account_id: int) -> array:
+        return self.friends_many(db, [account_id])[account_id]
+
+    def friends_many(self, db: Session, account_ids) -> dict:
+        result = {}
+        missing = []
+        now = time.monotonic()
+        with self._lock:
+            for id in account_ids:
+                ids = self._adjacency.get(id)
+                if ids is None or self._expires[id] < now:
+                    missing.append(id)
+                else:
+                    self._adjacency.move_to_end(id)
+                    result[id] = ids
+            self.hits += len(result)
+            self.misses += len(missing)
+
+        if missing:
+            loaded = {id: [] for id in missing}
+            for i in range(0, len(missing), 1000):
+                chunk = missing[i:i + 1000]
+                rows = db.query(models.friends.c.account_id, models.friends.c.friend_id).filter(
+                    models.friends.c.account_id.in_(chunk)
+                )
+                for account_id, friend_id in rows:
+                    loaded[account_id].append(friend_id)
+            with self._lock:
+                for id, friend_ids in loaded.items():
+                    ids = array('i', sorted(friend_ids))
+                    self._adjacency[id] = ids
+                    self._adjacency.move_to_end(id)
+                    self._expires[id] = now + self.ttl
+                    result[id] = ids
+                while len(self._adjacency) > self.maxsize:
+                    id, _ = self._adjacency.popitem(last=False)
+                    del self._expires[id]
+        return result
+
+    def add_friendship(self, account_id: int, friend_id: int):
+        with self._lock:
+            for a, b in ((account_id, friend_id), (friend_id, account_id)):
+                ids = self._adjacency.get(a)
+                if ids is not None:
+                    i = bisect_left(ids, b)
+                    if i == len(ids) or ids[i] != b:
+                        ids.insert(i, b)
+
+    def remove_account(self, account_id: int):
+        with self._lock:
+            ids = self._adjacency.pop(account_id, None)
+            if ids is None:
+                # Without the account's own list we cannot tell which entries mention it
+                self._adjacency.clear()
+                self._expires.clear()
+                return
+            del self._expires[account_id]
+            for friend_id in ids:
+                friend_ids = self._adjacency.get(friend_id)
+                if friend_ids is not None:
+                    i = bisect_left(friend_ids, account_id)
+                    if i < len(friend_ids) and friend_ids[i] == account_id:
+                        del friend_ids[i]
+
+    def suggestions(self, db: Session, account_id: int, limit: int = 10):
+        # Friends of friends ranked by the number of mutual friends, as (account_id, mutual_friends)
+        mine = self.friends(db, account_id)
+        excluded = set(mine)
+        excluded.add(account_id)
+        counts = Counter()
+        for friend_ids in self.friends_many(db, list(mine)).values():
+            counts.update(id for id in friend_ids if id not in excluded)
+        return heapq.nsmallest(limit, counts.items(), key=lambda item: (-item[1], item[0]))
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._adjacency), "maxsize": self.maxsize}
+
+friend_graph = FriendGraph()
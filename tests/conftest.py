@@ -0,0 +1,56 @@
+import itertools
+import os
+import sys
+import tempfile
+import pytest
+
+# The app modules live at the repository root and read DATABASE_URL at import time, so the test
+# database is chosen before anything imports them. TEST_DATABASE_URL runs the suite against MySQL;
+# it defaults to a throwaway SQLite file (not :memory:, which the async engine could not share).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_db_file = os.path.join(tempfile.mkdtemp(prefix="aura-tests-"), "test.db")
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL", f"sqlite:///{_db_file}")
+
+import migrate
+import models
+from database import SessionLocal
+
+_ids = itertools.count(1)
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    migrate.create_all()
+
+@pytest.fixture
+def db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture
+def make_account(db):
+    def make(points: int = 0):
+        n = next(_ids)
+        db_account = models.Account(
+            username=f"test{n}-{os.getpid()}",
+            email=f"test{n}-{os.getpid()}@example.com",
+            password="unused",
+            points=points,
+            first_name="Test",
+            last_name=f"User{n}"
+        )
+        db.add(db_account)
+        db.commit()
+        return db_account
+    return make
+
+@pytest.fixture
+def make_challenge(db):
+    def make(points: int = 10):
+        db_challenge = models.Challenge(description=f"Test challenge {next(_ids)}-{os.getpid()}", points=points)
+        db.add(db_challenge)
+        db.commit()
+        return db_challenge
+    return make
@@ -0,0 +1,44 @@
+import pytest
+from fastapi.testclient import TestClient
+import main
+
+# Bulk endpoints report failures per item; an item that conflicts with existing rows must not fail the batch
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+def test_accepting_the_other_side_of_a_mutual_request(client, make_account):
+    a, b, c = make_account(), make_account(), make_account()
+    assert client.post(f"/accounts/{a.id}/send_friend_request/{b.id}").status_code == 200
+    assert client.post(f"/accounts/{b.id}/send_friend_request/{a.id}").status_code == 200
+    assert client.post(f"/accounts/{c.id}/send_friend_request/{a.id}").status_code == 200
+    assert client.post(f"/accounts/{a.id}/accept_friend_request/{b.id}").status_code == 200
+
+    response = client.post(f"/accounts/{a.id}/accept_friend_requests", json=[b.id, c.id])
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": b.id, "ok": False, "detail": "Already friends."},
+        {"id": c.id, "ok": True, "detail": None}
+    ]
+
+def test_sending_requests_to_friends_and_from_unknown_accounts(client, make_account):
+    a, b, c = make_account(), make_account(), make_account()
+    client.post(f"/accounts/{a.id}/send_friend_request/{b.id}")
+    client.post(f"/accounts/{a.id}/accept_friend_request/{b.id}")
+
+    response = client.post(f"/accounts/{a.id}/send_friend_requests", json=[b.id, c.id])
+    assert [(r["ok"], r["detail"]) for r in response.json()] == [(False, "Already friends."), (True, None)]
+
+    response = client.post("/accounts/999999999/send_friend_requests", json=[c.id])
+    assert response.json() == [{"id": c.id, "ok": False, "detail": "Account not found."}]
+
+def test_accepting_challenges_already_accepted(client, make_account, make_challenge):
+    account, first, second = make_account(), make_challenge(), make_challenge()
+    assert client.post(f"/accounts/{account.id}/accept_challenge/{first.id}").status_code == 200
+
+    response = client.post(f"/accounts/{account.id}/accept_challenges", json=[first.id, second.id, second.id])
+    assert [(r["ok"], r["detail"]) for r in response.json()] == [
+        (False, "Challenge already accepted."), (True, None), (False, "Challenge already accepted.")
+    ]
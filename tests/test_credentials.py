@@ -0,0 +1,56 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+import credentials
+import main
+import models
+
+# Cheap scrypt costs keep the worker pool fast; the production defaults only change the work per hash
+N = 2 ** 10
+
+@pytest.fixture(autouse=True)
+def cheap_scrypt(monkeypatch):
+    monkeypatch.setattr(credentials, "SCRYPT_N", N)
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+def test_hash_and_verify():
+    stored = asyncio.run(credentials.hash_password("correct horse"))
+    assert stored.startswith(f"scrypt${N}$")
+    assert asyncio.run(credentials.verify_password("correct horse", stored)) == (True, False)
+    assert asyncio.run(credentials.verify_password("wrong horse", stored)) == (False, False)
+
+def test_cost_change_asks_for_a_rehash(monkeypatch):
+    stored = asyncio.run(credentials.hash_password("correct horse"))
+    monkeypatch.setattr(credentials, "SCRYPT_N", N * 2)
+    assert asyncio.run(credentials.verify_password("correct horse", stored)) == (True, True)
+    assert asyncio.run(credentials.verify_password("wrong horse", stored)) == (False, False)
+
+def test_legacy_plaintext_rows_are_rehashed():
+    assert asyncio.run(credentials.verify_password("plain", "plain")) == (True, True)
+    assert asyncio.run(credentials.verify_password("other", "plain")) == (False, False)
+    assert asyncio.run(credentials.verify_password("plain", None)) == (False, False)
+
+def test_signup_stores_a_hash_and_login_verifies_it(client, db):
+    response = client.post("/accounts/", json={
+        "email": "hashed@example.com", "username": "hashed", "password": "s3cret",
+        "first_name": "Hashed", "last_name": "User"
+    })
+    assert response.status_code == 200, response.text
+    stored = db.query(models.Account.password).filter(models.Account.id == response.json()["id"]).scalar()
+    assert stored.startswith("scrypt$") and "s3cret" not in stored
+
+    assert client.post("/accounts/login", json={"email": "hashed@example.com", "password": "s3cret"}).status_code == 200
+    assert client.post("/accounts/login", json={"email": "hashed@example.com", "password": "guess"}).status_code == 401
+
+def test_login_rehashes_a_legacy_password(client, db, make_account):
+    account = make_account()
+    response = client.post("/accounts/login", json={"email": account.email, "password": "unused"})
+    assert response.status_code == 200, response.text
+    db.expire_all()
+    stored = db.query(models.Account.password).filter(models.Account.id == account.id).scalar()
+    assert stored.startswith(f"scrypt${N}$")
+    assert client.post("/accounts/login", json={"email": account.email, "password": "unused"}).status_code == 200
@@ -0,0 +1,87 @@
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import func
+import crud
+import models
+from database import SessionLocal
+
+# SQLite serializes writers from the first UPDATE on, so lost increments only show up against
+# MySQL: run with TEST_DATABASE_URL=mysql+mysqlconnector://... to stress the real locking
+WORKERS = 16
+
+def resolve(account_id: int, challenge_id: int, completed: bool):
+    # Each call gets its own session, like concurrent requests do
+    db = SessionLocal()
+    try:
+        if completed:
+            return crud.complete_challenge(db, account_id, challenge_id)
+        return crud.fail_challenge(db, account_id, challenge_id)
+    except Exception as e:
+        return e
+    finally:
+        db.close()
+
+def balance(db, account_id: int):
+    db.expire_all()
+    points = db.query(models.Account.points).filter(models.Account.id == account_id).scalar()
+    ledger = db.query(func.coalesce(func.sum(models.PointsLedger.delta), 0)).filter(
+        models.PointsLedger.account_id == account_id
+    ).scalar()
+    return points, ledger
+
+def test_parallel_resolutions_match_the_ledger(db, make_account, make_challenge):
+    account = make_account(points=1000)
+    challenges = [make_challenge(points=i) for i in range(1, 101)]
+    crud.accept_challenges(db, account.id, [c.id for c in challenges])
+
+    # Completions and failures of different challenges all move the same account's points
+    outcomes = [(c.id, c.points % 3 != 0) for c in challenges]
+    with ThreadPoolExecutor(WORKERS) as pool:
+        results = list(pool.map(lambda o: resolve(account.id, *o), outcomes))
+
+    assert not [r for r in results if isinstance(r, Exception)]
+    expected = sum(c.points if c.points % 3 != 0 else -c.points for c in challenges)
+    points, ledger = balance(db, account.id)
+    assert ledger == expected
+    assert points == 1000 + ledger
+
+def test_racing_resolutions_of_one_challenge_apply_once(db, make_account, make_challenge):
+    account = make_account()
+    challenge = make_challenge(points=25)
+    crud.accept_challenge(db, account.id, challenge.id)
+
+    # Duplicate completes and a conflicting fail race; exactly one may win
+    attempts = [True] * (WORKERS - 1) + [False]
+    with ThreadPoolExecutor(WORKERS) as pool:
+        results = list(pool.map(lambda completed: resolve(account.id, challenge.id, completed), attempts))
+
+    assert len([r for r in results if not isinstance(r, Exception)]) == 1
+    rows = db.query(models.PointsLedger).filter(models.PointsLedger.challenge_id == challenge.id).all()
+    assert len(rows) == 1
+    points, ledger = balance(db, account.id)
+    assert points == ledger == rows[0].delta
+
+def test_resolving_an_unaccepted_challenge_changes_nothing(db, make_account, make_challenge):
+    account = make_account(points=7)
+    challenge = make_challenge()
+    assert resolve(account.id, challenge.id, True) is None
+    assert balance(db, account.id) == (7, 0)
+
+def accept(account_id: int, challenge_id: int):
+    db = SessionLocal()
+    try:
+        return crud.accept_challenge(db, account_id, challenge_id)
+    except Exception as e:
+        return e
+    finally:
+        db.close()
+
+def test_racing_accepts_of_one_challenge_insert_once(db, make_account, make_challenge):
+    account = make_account()
+    challenge = make_challenge()
+    with ThreadPoolExecutor(WORKERS) as pool:
+        results = list(pool.map(lambda _: accept(account.id, challenge.id), range(WORKERS)))
+
+    errors = [r for r in results if isinstance(r, Exception)]
+    assert len(errors) == WORKERS - 1
+    assert all(str(e) == "Challenge already accepted." for e in errors)
+    assert db.query(models.ChallengeStatus).filter(models.ChallengeStatus.challenge_id == challenge.id).count() == 1
@@ -0,0 +1,90 @@
+import pytest
+from fastapi.testclient import TestClient
+import crud
+import main
+import models
+from database import SessionLocal
+
+# List endpoints must cost a constant number of SQL queries however many rows (and friends per row)
+# they return; metrics.record_request reports the count in the X-Query-Count header
+FRIENDS = 60
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+@pytest.fixture(scope="module")
+def graph(schema):
+    # A hub with FRIENDS friends, each of them friends with each other's neighbours, a leaf with one
+    # friend, and friend requests in both directions for the hub
+    db = SessionLocal()
+    try:
+        accounts = [
+            models.Account(username=f"qc{i:03d}", email=f"qc{i}@example.com", password="unused", points=i,
+                           first_name="Query", last_name=f"Count{i}")
+            for i in range(FRIENDS + 2)
+        ]
+        db.add_all(accounts)
+        db.add_all(models.Challenge(description=f"Query count challenge {i}", points=i) for i in range(FRIENDS))
+        db.commit()
+        hub, leaf, others = accounts[0].id, accounts[1].id, [a.id for a in accounts[2:]]
+
+        edges = {(hub, o) for o in others} | {(leaf, others[0])}
+        edges |= {(a, b) for a, b in zip(others, others[1:])}
+        edges |= {(b, a) for a, b in edges}
+        db.execute(models.friends.insert(), [{"account_id": a, "friend_id": b} for a, b in edges])
+        db.execute(models.friend_requests.insert(), [{"sender_id": hub, "receiver_id": o} for o in others[:30]])
+        db.execute(models.friend_requests.insert(), [{"sender_id": o, "receiver_id": hub} for o in others[30:]])
+        db.commit()
+        return {"hub": hub, "leaf": leaf}
+    finally:
+        db.close()
+
+def query_count(client, path: str, **params) -> int:
+    response = client.get(path, params=params)
+    assert response.status_code == 200, response.text
+    return int(response.headers["X-Query-Count"])
+
+def warm_counts(client, path: str, small: dict, large: dict):
+    # The first call may fill caches and in-memory indexes; compare steady-state requests. Whole-page
+    # caches are cleared before each measured call, or the comparison would be between two cache hits.
+    query_count(client, path, **small)
+    query_count(client, path, **large)
+    counts = []
+    for params in (small, large):
+        crud.challenge_page_cache.clear()
+        counts.append(query_count(client, path, **params))
+    return counts
+
+@pytest.mark.parametrize("path", [
+    "/accounts/",
+    "/challenges/",
+    "/accounts/leaderboard",
+    "/accounts/search/",
+    "/accounts/{hub}/friends/leaderboard",
+    "/accounts/{hub}/friends/suggestions",
+    "/accounts/{hub}/sent_friend_requests",
+    "/accounts/{hub}/received_friend_requests",
+])
+def test_page_size_does_not_change_query_count(client, graph, path):
+    path = path.format(**graph)
+    extra = {"username": "qc"} if path.startswith("/accounts/search/") else {}
+    small, large = warm_counts(client, path, {"limit": 2, **extra}, {"limit": 50, **extra})
+    assert small == large
+    assert 1 <= large <= 3
+
+def test_friend_count_does_not_change_query_count(client, graph):
+    path = "/accounts/{}/friends"
+    query_count(client, path.format(graph["hub"]))
+    query_count(client, path.format(graph["leaf"]))
+    assert query_count(client, path.format(graph["hub"])) == query_count(client, path.format(graph["leaf"]))
+
+def test_warm_challenge_pick_is_served_from_memory(client, graph):
+    # The eligibility index and the challenge cache answer repeat picks for the same account
+    response = client.post("/challenges/", json={"description": "Query count pick", "points": 10 ** 6})
+    assert response.status_code == 200, response.text
+    path = f"/accounts/{graph['leaf']}/get_challenge"
+    params = {"min_points": 10 ** 6, "max_points": 10 ** 6}
+    assert client.get(path, params=params).json()["id"] == response.json()["id"]
+    assert query_count(client, path, **params) == 0
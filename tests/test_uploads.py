@@ -0,0 +1,53 @@
+from io import BytesIO
+import pytest
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+from image_ingest import UploadLimit, read_upload, open_image
+
+# Oversized uploads are refused before the multipart body is parsed, oversized images before decoding
+MAX_BYTES = 1000
+
+app = FastAPI()
+app.add_middleware(UploadLimit, max_bytes=MAX_BYTES)
+parsed = []
+
+@app.post("/upload")
+async def upload(file: UploadFile = File(...)):
+    parsed.append(file.filename)
+    return {"size": len(await read_upload(file, max_bytes=MAX_BYTES // 2))}
+
+@pytest.fixture
+def client():
+    parsed.clear()
+    with TestClient(app) as client:
+        yield client
+
+def test_small_upload_is_read(client):
+    response = client.post("/upload", files={"file": ("a.jpg", b"x" * 100, "image/jpeg")})
+    assert response.status_code == 200
+    assert response.json() == {"size": 100}
+
+def test_declared_length_over_the_cap_is_refused_before_parsing(client):
+    response = client.post("/upload", files={"file": ("a.jpg", b"x" * (MAX_BYTES * 2), "image/jpeg")})
+    assert response.status_code == 413
+    assert parsed == []
+
+def test_streamed_body_over_the_cap_is_cut_off(client):
+    # No Content-Length: the body arrives in chunks and is counted as it is received
+    body = b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.jpg\"\r\n\r\n" + b"x" * (MAX_BYTES * 2)
+    chunks = (body[i:i + 100] for i in range(0, len(body), 100))
+    response = client.post("/upload", content=chunks, headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 413
+    assert parsed == []
+
+def test_file_part_over_its_cap_is_refused(client):
+    response = client.post("/upload", files={"file": ("a.jpg", b"x" * (MAX_BYTES // 2 + 1), "image/jpeg")})
+    assert response.status_code == 413
+
+def test_decompression_bomb_is_a_bad_request():
+    from PIL import Image
+    out = BytesIO()
+    Image.new("1", (20000, 10000)).save(out, format="PNG")
+    with pytest.raises(HTTPException) as e:
+        open_image(out.getvalue(), (224, 224))
+    assert e.value.status_code == 400
@@ -0,0 +1,15 @@
+from datetime import datetime, timedelta
+import crud
+import models
+
+def test_purge_removes_expired_then_oldest_verdicts(db):
+    db.query(models.Verdict).delete()
+    now = datetime.utcnow()
+    # Two expired rows and five live ones, a minute apart
+    for i, age in enumerate([7200, 3600, 300, 240, 180, 120, 60]):
+        db.add(models.Verdict(key=f"purge{i}", verdict="yes", created_at=now - timedelta(seconds=age)))
+    db.commit()
+
+    assert crud.purge_verdicts(db, max_age=1800, max_rows=3) == 4
+    assert sorted(key for (key,) in db.query(models.Verdict.key)) == ["purge4", "purge5", "purge6"]
+    assert crud.get_verdict(db, "purge6", max_age=1800) == "yes"
@@ -0,0 +1,72 @@
+import asyncio
+import hashlib
+import os
+import time
+from cache import TTLCache
+from metrics import model_seconds
+
+PREDICT_CONCURRENCY = int(os.getenv("PREDICT_CONCURRENCY", "8"))
+PREDICT_QUEUE_SIZE = int(os.getenv("PREDICT_QUEUE_SIZE", "32"))
+PREDICT_TIMEOUT = float(os.getenv("PREDICT_TIMEOUT", "30"))
+
+VERDICT_CACHE_SIZE = int(os.getenv("VERDICT_CACHE_SIZE", "10000"))
+VERDICT_CACHE_TTL = float(os.getenv("VERDICT_CACHE_TTL", "86400"))
+VERDICT_CACHE_SQL = os.getenv("VERDICT_CACHE_SQL", "0") == "1"
+# The SQL tier keeps at most this many verdicts; expired and excess rows are purged every VERDICT_PURGE_EVERY stores
+VERDICT_CACHE_SQL_ROWS = int(os.getenv("VERDICT_CACHE_SQL_ROWS", "1000000"))
+VERDICT_PURGE_EVERY = int(os.getenv("VERDICT_PURGE_EVERY", "1000"))
+
+PROMPT = "respond with ONLY yes or no. does the image match the previous statement?"
+
+verdict_cache = TTLCache("verdicts", maxsize=VERDICT_CACHE_SIZE, ttl=VERDICT_CACHE_TTL)
+
+def verdict_key(data: bytes, description: str) -> str:
+    # Content address of a submission: the image bytes plus the challenge description it is checked against
+    digest = hashlib.sha256(data)
+    digest.update(b"\0")
+    digest.update(description.encode())
+    return digest.hexdigest()
+
+class VerifierSaturated(Exception):
+    pass
+
+class Verifier:
+    # Runs model calls on the event loop with at most `concurrency` in flight and `queue_size` waiting
+    def __init__(self, load_model, concurrency: int = PREDICT_CONCURRENCY, queue_size: int = PREDICT_QUEUE_SIZE, timeout: float = PREDICT_TIMEOUT):
+        self.load_model = load_model
+        self.model = None
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(concurrency)
+        self._capacity = concurrency + queue_size
+        self._pending = 0
+
+    async def verify(self, description: str, mime_type: str, data: bytes) -> str:
+        if self._pending >= self._capacity:
+            raise VerifierSaturated("Too many verifications in progress, try again later.")
+        self._pending += 1
+        try:
+            async with self._slots:
+                if self.model is None:
+                    self.model = await asyncio.to_thread(self.load_model)
+                start = time.perf_counter()
+                outcome = "error"
+                try:
+                    response = await asyncio.wait_for(
+                        self.model.generate_content_async([description + PROMPT, {
+                            'mime_type': mime_type,
+                            'data': data
+                        }]),
+                        timeout=self.timeout
+                    )
+                    outcome = "ok"
+                except asyncio.TimeoutError:
+                    outcome = "timeout"
+                    raise
+                finally:
+                    model_seconds.observe(time.perf_counter() - start, model="gemini", outcome=outcome)
+            return response.text
+        finally:
+            self._pending -= 1
+
+    def pending(self):
+        return self._pending